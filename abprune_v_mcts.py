@@ -6,29 +6,13 @@ import time
 import uuid
 import os
 
-def capture_diff(game_state):
-    black_stones = 0
-    white_stones = 0
-    for r in range(1, game_state.board.num_rows + 1):
-        for c in range(1, game_state.board.num_cols + 1):
-            p = gotypes.Point(r, c)
-            color = game_state.board.get(p)
-            if color == gotypes.Player.black:
-                black_stones += 1
-            elif color == gotypes.Player.white:
-                white_stones += 1
-    diff = black_stones - white_stones
-    if game_state.next_player == gotypes.Player.black:
-        return diff
-    return -1 * diff
-
 def main():
     
     board_size = 9
     game = goboard.GameState.new_game(board_size)
     bots = {
-        gotypes.Player.black: mcts.MCTSAgent(temperature=1.41, num_rounds=50),
-        gotypes.Player.white: minimax.AlphaBetaAgent(max_depth=3, eval_fn=capture_diff),
+        gotypes.Player.black: mcts.MCTSAgent(temperature=1.41, num_rounds=50, verbose=True),
+        gotypes.Player.white: minimax.AlphaBetaAgent(max_depth=3, eval_fn=minimax.capture_diff),
     }
     # Generate random game id and SGF file
     game_id = str(uuid.uuid4())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark of AlphaBetaAgent's negamax / PVS search against the earlier
+best_black / best_white alpha-beta, on fixed 9x9 positions. Both searches
+deepen iteratively with the same move ordering; the script prints the
+nodes each one visits to reach the same depth.
+"""
+
+import random
+import time
+
+from dlgo import goboard, gotypes
+from dlgo.agent import RandomBot
+from dlgo.minimax import AlphaBetaAgent, MoveOrdering, alpha_beta_result, capture_diff
+from dlgo.minimax.alphabetaprune import MIN
+
+
+def fixed_position(seed, num_moves, board_size=9):
+    random.seed(seed)
+    game = goboard.GameState.new_game(board_size)
+    bot = RandomBot()
+    for _ in range(num_moves):
+        move = bot.select_move(game)
+        if not move.is_play:
+            continue
+        game = game.apply_move(move)
+    return game
+
+
+def legacy_search(game_state, max_depth, eval_fn):
+    """Iterative deepening over alpha_beta_result, as AlphaBetaAgent did
+    before negamax. Returns the number of nodes visited."""
+    ordering = MoveOrdering()
+    moves = ordering.order(game_state, 0)
+    for depth in range(max_depth + 1):
+        scores = {}
+        best_score = None
+        best_white_score = MIN
+        best_black_score = MIN
+        for move in moves:
+            result = -alpha_beta_result(game_state.apply_move(move), depth, best_black_score,
+                                        best_white_score, eval_fn, ordering=ordering, ply=1)
+            scores[move] = result
+            if best_score is None or result > best_score:
+                best_score = result
+                if game_state.next_player == gotypes.Player.white:
+                    best_white_score = result
+                else:
+                    best_black_score = result
+        moves = sorted(moves, key=lambda move: scores[move], reverse=True)
+        ordering.record_best(game_state, moves[0])
+    return ordering.nodes
+
+
+def main():
+    max_depth = 1
+    positions = [(seed, num_moves) for seed in range(3) for num_moves in (10, 30)]
+
+    print(f"{'position':>12} {'legacy':>10} {'negamax':>10} {'ratio':>7} {'legacy s':>9} {'negamax s':>9}")
+    total_legacy = 0
+    total_negamax = 0
+    for seed, num_moves in positions:
+        game = fixed_position(seed, num_moves)
+
+        start = time.time()
+        legacy_nodes = legacy_search(game, max_depth, capture_diff)
+        legacy_time = time.time() - start
+
+        agent = AlphaBetaAgent(max_depth=max_depth, eval_fn=capture_diff)
+        start = time.time()
+        agent.select_move(game)
+        negamax_time = time.time() - start
+        negamax_nodes = agent.nodes
+
+        total_legacy += legacy_nodes
+        total_negamax += negamax_nodes
+        print(f"{f'{seed}/{num_moves}':>12} {legacy_nodes:>10} {negamax_nodes:>10} "
+              f"{negamax_nodes / legacy_nodes:>7.2f} {legacy_time:>9.1f} {negamax_time:>9.1f}")
+    print(f"{'total':>12} {total_legacy:>10} {total_negamax:>10} {total_negamax / total_legacy:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
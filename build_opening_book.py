@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Script to build an opening book from the KGS archives in the data directory.
+The book is saved to data/opening_book.npz and can be passed to MCTSAgent
+or AlphaBetaAgent as opening_book.
+"""
+
+import os
+import sys
+
+# Add the current directory to Python path to import dlgo modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dlgo.openingbook import OpeningBook
+
+
+def main():
+    """Main function to build the opening book."""
+
+    # Configuration
+    data_dir = "data"
+    max_moves = 30
+    min_count = 2
+    output_file = f"{data_dir}/opening_book.npz"
+
+    book = OpeningBook(board_size=19)
+    for file in sorted(os.listdir(data_dir)):
+        if file.endswith('.tar.gz'):
+            print(f"Adding {file}")
+            book.add_sgf_files(zip_file_name=f"{data_dir}/{file}", max_moves=max_moves)
+
+    book.finish(min_count=min_count)
+    book.save(output_file)
+    print(f"Saved {len(book.entries)} book moves to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
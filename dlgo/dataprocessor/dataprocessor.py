@@ -28,8 +28,19 @@ transformations = [
 2. augment 8 symmetries and reflections to the dataset
 '''
 class DataProcessor:
-    def __init__(self, encoder, data_dir):
-        self.encoder = get_encoder_by_name(encoder, 19)
+    """Turns SGF games into feature and label .npy files.
+
+    Features are saved with the given dtype. With packed=True, they are
+    stored as uint8 with np.packbits along the plane axis, so 8 planes of
+    a point take one byte; encoders whose planes are not all 0/1 (see
+    Encoder.binary) are rejected. Pass the encoder's number of planes to
+    GoDataLoader to unpack them.
+    """
+    def __init__(self, encoder, data_dir, dtype=np.float64, packed=False):
+        self.packed = packed
+        if packed and not get_encoder_by_name(encoder, 19).binary:
+            raise ValueError('%s features are not all 0/1 and cannot be packed' % encoder)
+        self.encoder = get_encoder_by_name(encoder, 19, dtype=np.uint8 if packed else dtype)
         self.data_dir = data_dir
     
     def process_sgf_files(self, zip_file_name = None, file_list = None):
@@ -72,8 +83,10 @@ class DataProcessor:
             game_state, first_move_done = self.get_handicap(sgf)
             
             # then we play the moves from the sequence
-            # for every game state, we encode the game state and append to features
-            # and next move we encode as label
+            # for every game state, we keep the game state to encode and the
+            # next move to encode as label
+            game_states = []
+            points = []
             for item in sgf.main_sequence_iter():
                 color, move_tuple = item.get_move()
                 point = None
@@ -85,18 +98,31 @@ class DataProcessor:
                         move = Move.play(point)
                         # skipping first move
                         if first_move_done:
-                            # augmenting 8 symmetrical transformations to features and labels - [2]
-                            for transformation in transformations:
-                                transformed_game_state = self.apply_transformation(game_state, transformation)
-                                transformed_point = self.transform_point(point, transformation, 19)
-                                features.append(self.encoder.encode(transformed_game_state)) 
-                                labels.append(self.encoder.encode_point(transformed_point))
+                            game_states.append(game_state)
+                            points.append(point)
                     # skip on pass moves - [1]
                     else:
                         move = Move.pass_turn()    
                     game_state = game_state.apply_move(move)
                     first_move_done = True
 
+            if game_states:
+                # encode the game once, then augment the 8 symmetrical
+                # transformations to features and labels - [2]. The planes
+                # transform with the board, so the encoded tensors can be
+                # transformed instead of the game states.
+                encoded = self.encoder.encode_batch(game_states)
+                augmented = np.stack(
+                    [self.transform_planes(encoded, transformation)
+                     for transformation in transformations], axis=1).reshape((-1,) + encoded.shape[1:])
+                if self.packed:
+                    augmented = self.pack_features(augmented)
+                features.append(augmented)
+                labels.extend(
+                    self.encoder.encode_point(self.transform_point(point, transformation, board_size))
+                    for point in points
+                    for transformation in transformations)
+
         # Save the processed data
         base_name = zip_file_name.replace('.tar.gz', '') if zip_file_name else 'kgs-server-'
         data_file_name = self.data_dir + '/' + base_name
@@ -105,6 +131,7 @@ class DataProcessor:
         test_feature_file_template = data_file_name + '_test_features'
         test_label_file_template = data_file_name + '_test_labels'
 
+        features = np.concatenate(features, axis=0)
         indices = np.arange(len(features))
         # training to test split ratio 4:1, Alphago originally uses first 1 million
         # for the test while the rest 28.4 million for training. For simplicity we just split
@@ -113,7 +140,6 @@ class DataProcessor:
         train_indices = indices[:split_idx]
         test_indices = indices[split_idx:]
 
-        features = np.stack(features, axis=0)
         labels = np.asarray(labels, dtype=np.int16)
 
         X_train = features[train_indices]
@@ -226,7 +252,9 @@ class DataProcessor:
         print(f"Combined {file_type} saved to: {output_filename}")
         
         return output_path 
-    def transform_point(self, point, transformation, board_size):
+
+    @staticmethod
+    def transform_point(point, transformation, board_size):
         """Transform a point according to the given transformation."""
         r, c = point.row, point.col
         N = board_size
@@ -250,40 +278,38 @@ class DataProcessor:
         else:
             raise ValueError(f"Unknown transformation: {transformation}")  
 
-    def apply_transformation(self, game_state, transformation):
-        """Apply a D8 transformation to a game_state and its previous state chain."""
-        board_size = game_state.board.num_rows
-        new_board = Board(board_size, board_size)
-        last_move = game_state.last_move
-        if last_move is not None and last_move.is_play:
-            last_point = last_move.point
-            transformed_last_point = self.transform_point(last_point, transformation, board_size)
-            last_move = Move.play(transformed_last_point)
-        elif last_move is not None and last_move.is_pass:
-            last_move = Move.pass_turn()
-        elif last_move is not None and last_move.is_resign:
-            last_move = Move.resign()
-        # If last_move is None, keep it as None
-        
-        # Iterate through all points on the original board
-        for row in range(1, board_size + 1):
-            for col in range(1, board_size + 1):
-                original_point = Point(row, col)
-                stone_color = game_state.board.get(original_point)
-                
-                if stone_color is not None:
-                    # Transform the point
-                    transformed_point = self.transform_point(original_point, transformation, board_size)
-                    # Place stone at transformed location
-                    new_board.place_stone(stone_color, transformed_point)
-        
-        # Recursively transform the previous state if it exists
-        transformed_previous_state = None
-        if game_state.previous_state is not None:
-            transformed_previous_state = self.apply_transformation(
-                game_state.previous_state, transformation
-            )
-        
-        # Create new GameState with transformed board and previous state
-        return GameState(new_board, game_state.next_player, transformed_previous_state, last_move)    
+    @staticmethod
+    def pack_features(features):
+        """Pack an (N, planes, rows, cols) array of 0/1 features to
+        (N, ceil(planes / 8), rows, cols) uint8."""
+        if features.max(initial=0) > 1:
+            raise ValueError('packed features must be 0 or 1')
+        return np.packbits(features, axis=1)
+
+    @staticmethod
+    def unpack_features(packed, num_planes, dtype=np.float32):
+        """Inverse of pack_features."""
+        return np.unpackbits(packed, axis=1, count=num_planes).astype(dtype, copy=False)
 
+    @staticmethod
+    def transform_planes(planes, transformation):
+        """Transform the last two (row, col) axes of an encoded array the
+        same way transform_point moves points."""
+        if transformation == 'identity':
+            return planes
+        elif transformation == 'rotate_90':
+            return np.rot90(planes, -1, axes=(-2, -1))
+        elif transformation == 'rotate_180':
+            return np.rot90(planes, 2, axes=(-2, -1))
+        elif transformation == 'rotate_270':
+            return np.rot90(planes, 1, axes=(-2, -1))
+        elif transformation == 'flip_horizontal':
+            return np.flip(planes, -1)
+        elif transformation == 'flip_vertical':
+            return np.flip(planes, -2)
+        elif transformation == 'flip_diagonal':
+            return np.swapaxes(planes, -2, -1)
+        elif transformation == 'flip_antidiagonal':
+            return np.flip(np.swapaxes(planes, -2, -1), (-2, -1))
+        else:
+            raise ValueError(f"Unknown transformation: {transformation}")
@@ -1,3 +1,5 @@
 from dlgo.encoders.base import *
 from dlgo.encoders.oneplane import *
-from dlgo.encoders.fourplane import *
\ No newline at end of file
+from dlgo.encoders.fourplane import *
+from dlgo.encoders.alphago import *
+from dlgo.encoders.history import *
@@ -0,0 +1,171 @@
+from dlgo.encoders.base import Encoder
+from dlgo.gotypes import Point
+from dlgo.tactics import TacticalReader
+import numpy as np
+
+__all__ = [
+    'AlphaGoEncoder',
+]
+
+"""
+Feature name            num of planes   Description
+Stone colour            3               Player stone / opponent stone / empty
+Ones                    1               A constant plane filled with 1
+Turns since             8               How many turns since a stone was played
+Liberties               8               Number of liberties (empty adjacent points)
+Capture size            8               How many opponent stones would be captured
+Self-atari size         8               How many of own stones would be captured
+Liberties after move    8               Number of liberties after this move is played
+Ladder capture          1               Whether a move at this point is a successful ladder capture
+Ladder escape           1               Whether a move at this point is a successful ladder escape
+Sensibleness            1               Whether a move is legal and does not fill its own eyes
+Zeros                   1               A constant plane filled with 0
+
+The feature set of the AlphaGo policy network, with the planes in the
+order of the paper. Turns since counts stones placed, so passes are not
+counted. Ladders are read with TacticalReader, at most ladder_nodes
+positions per string; a ladder that takes longer to read is left unmarked.
+Reading is by far the most expensive part of the encoding.
+"""
+
+FEATURE_OFFSETS = {
+    "stone_color": 0,
+    "ones": 3,
+    "turns_since": 4,
+    "liberties": 12,
+    "capture_size": 20,
+    "self_atari_size": 28,
+    "liberties_after": 36,
+    "ladder_capture": 44,
+    "ladder_escape": 45,
+    "sensibleness": 46,
+    "zeros": 47
+}
+
+
+def offset(feature):
+    return FEATURE_OFFSETS[feature]
+
+
+def one_hot(batch_plane, values, first, num_planes=8):
+    """Spread an array of per-point values over num_planes planes: value
+    first + k goes to plane k and the last plane takes every value from
+    there up. Values below first set no plane."""
+    for k in range(num_planes):
+        if k == num_planes - 1:
+            batch_plane[k] = values >= first + k
+        else:
+            batch_plane[k] = values == first + k
+
+
+class AlphaGoEncoder(Encoder):
+    def __init__(self, board_size=(19, 19), dtype=np.float64, ladder_nodes=60):
+        self.board_width, self.board_height = board_size
+        self.num_planes = 48
+        # every plane is 0/1, so uint8 or bool lose nothing
+        self.dtype = dtype
+        self.binary = True
+        self.reader = TacticalReader(max_nodes=ladder_nodes)
+
+    def name(self):
+        return 'alphago'
+
+    def encode(self, game_state):
+        return self.encode_batch([game_state])[0]
+
+    def encode_batch(self, game_states, out=None, dtype=None):
+        """Encode several positions at once into an (N, 48, rows, cols)
+        array of dtype, the encoder's own by default. Stone, turns-since
+        and liberty planes come from the arrays the board keeps up to date;
+        the move planes are worked out for each legal point from its
+        neighbouring strings.
+        """
+        num_states = len(game_states)
+        if out is None:
+            if dtype is None:
+                dtype = self.dtype
+            out = np.zeros((num_states,) + self.shape(), dtype=dtype)
+        batch = out[:num_states]
+        batch[:] = 0
+
+        stones = np.stack([game_state.board.stone_array() for game_state in game_states])
+        players = np.fromiter((game_state.next_player.value for game_state in game_states),
+                              dtype=np.int8, count=num_states)[:, np.newaxis, np.newaxis]
+        stone_color_offset = offset("stone_color")
+        batch[:, stone_color_offset] = stones == players
+        batch[:, stone_color_offset + 1] = (stones != players) & (stones != 0)
+        batch[:, stone_color_offset + 2] = stones == 0
+        batch[:, offset("ones")] = 1
+
+        for game_state, planes in zip(game_states, batch):
+            board = game_state.board
+            one_hot(planes[offset("turns_since"):], board.stone_ages(), 1)
+            one_hot(planes[offset("liberties"):], board.liberty_array(), 1)
+            self.encode_moves(game_state, planes)
+        return out
+
+    def encode_moves(self, game_state, planes):
+        board = game_state.board
+        player = game_state.next_player
+        legal = game_state.legal_move_mask()
+        capture_size = np.zeros(legal.shape, dtype=np.int16)
+        self_atari_size = np.zeros(legal.shape, dtype=np.int16)
+        liberties_after = np.zeros(legal.shape, dtype=np.int16)
+        rows, cols = np.nonzero(legal)
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            point = Point(row + 1, col + 1)
+            num_captured, num_liberties, num_stones = board.move_summary(player, point)
+            capture_size[row, col] = num_captured
+            liberties_after[row, col] = num_liberties
+            if num_liberties == 1:
+                self_atari_size[row, col] = num_stones
+            if not board.is_eye(point, player):
+                planes[offset("sensibleness"), row, col] = 1
+        # no capture goes to the first plane, but only on legal points
+        planes[offset("capture_size")] = legal & (capture_size == 0)
+        one_hot(planes[offset("capture_size") + 1:], capture_size, 1, 7)
+        one_hot(planes[offset("self_atari_size"):], self_atari_size, 1)
+        one_hot(planes[offset("liberties_after"):], liberties_after, 1)
+        self.encode_ladders(game_state, planes, legal)
+
+    def encode_ladders(self, game_state, planes, legal):
+        """Ladder captures are liberties of opponent strings with two
+        liberties that leave the string unable to escape; ladder escapes
+        are moves that save an own string in atari from capture."""
+        board = game_state.board
+        player = game_state.next_player
+        seen = set()
+        for string in board._grid.values():
+            if string is None or string.num_liberties > 2 or string.stones in seen:
+                continue
+            seen.add(string.stones)
+            target = next(iter(string.stones))
+            if string.color != player and string.num_liberties == 2:
+                plane = planes[offset("ladder_capture")]
+                moves = self.reader.ladder_captures(board, target)
+            elif string.color == player and string.num_liberties == 1:
+                plane = planes[offset("ladder_escape")]
+                moves = self.reader.ladder_escapes(board, target)
+            else:
+                continue
+            for move in moves:
+                if legal[move.row - 1, move.col - 1]:
+                    plane[move.row - 1, move.col - 1] = 1
+
+    def encode_point(self, point):
+        return self.board_width * (point.row - 1) + (point.col - 1)
+
+    def decode_point_index(self, index):
+        row = index // self.board_width
+        col = index % self.board_width
+        return Point(row=row + 1, col=col + 1)
+
+    def num_points(self):
+        return self.board_width * self.board_height
+
+    def shape(self):
+        return self.num_planes, self.board_height, self.board_width
+
+
+def create(board_size, dtype=np.float64):
+    return AlphaGoEncoder(board_size, dtype=dtype)
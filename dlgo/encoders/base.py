@@ -4,6 +4,7 @@
 # tag::importlib[]
 import importlib
 # end::importlib[]
+import numpy as np
 
 __all__ = [
     'Encoder',
@@ -13,6 +14,12 @@ __all__ = [
 
 # tag::base_encoder[]
 class Encoder:
+    # numpy dtype of the encoded arrays, set per encoder with create(dtype=...)
+    dtype = np.float64
+    # True if every plane only holds 0 and 1, which is what packed
+    # feature storage needs
+    binary = False
+
     def name(self):  # <1>
         raise NotImplementedError()
 
@@ -31,6 +38,18 @@ class Encoder:
     def shape(self):  # <6>
         raise NotImplementedError()
 
+    def encode_batch(self, game_states, out=None, dtype=None):
+        """Encode several positions into an (N, planes, rows, cols) array
+        of dtype, the encoder's own by default, or into out if given.
+        Encoders with a faster batched path override this."""
+        if out is None:
+            if dtype is None:
+                dtype = self.dtype
+            out = np.zeros((len(game_states),) + tuple(self.shape()), dtype=dtype)
+        for i, game_state in enumerate(game_states):
+            out[i] = self.encode(game_state)
+        return out
+
 # <1> Lets us support logging or saving the name of the encoder our model is using.
 # <2> Turn a Go board into a numeric data.
 # <3> Turn a Go board point into an integer index.
@@ -41,14 +60,14 @@ class Encoder:
 
 
 # tag::encoder_by_name[]
-def get_encoder_by_name(name, board_size):  # <1>
+def get_encoder_by_name(name, board_size, **kwargs):  # <1>
     if isinstance(board_size, int):
         board_size = (board_size, board_size)  # <2>
     module = importlib.import_module('dlgo.encoders.' + name)
     constructor = getattr(module, 'create')  # <3>
-    return constructor(board_size)
+    return constructor(board_size, **kwargs)
 
 # <1> We can create encoder instances by referencing their name.
 # <2> If board_size is one integer, we create a square board from it.
-# <3> Each encoder implementation will have to provide a "create" function that provides an instance.
+# <3> Each encoder implementation will have to provide a "create" function that provides an instance. Extra keyword arguments, such as dtype, are passed on to it.
 # end::encoder_by_name[]
\ No newline at end of file
@@ -21,118 +21,59 @@ def offset(feature):
 
 
 class FourplaneEncoder(Encoder):
-    def __init__(self, board_size=(19, 19), use_player_plane=True, use_legal_moves=True):
+    def __init__(self, board_size=(19, 19), use_player_plane=True, use_legal_moves=True,
+                 dtype=np.float64):
         self.board_width, self.board_height = board_size
         self.use_player_plane = use_player_plane
         self.use_legal_moves = use_legal_moves
         self.num_planes = 4 + use_player_plane + use_legal_moves
+        # every plane is 0/1, so uint8 or bool lose nothing
+        self.dtype = dtype
+        self.binary = True
 
     def name(self):
-        return 'alphago'
+        return 'fourplane'
 
     def encode(self, game_state):
-        board_tensor = np.zeros((self.num_planes, self.board_height, self.board_width))
-        
-        # Set empty cells plane (default to empty)
-        board_tensor[offset("stone_color") + 2] = 1
-        
-        # Iterate over occupied points only (much faster for sparse boards)
-        next_player = game_state.next_player
-        opponent = next_player.other
+        return self.encode_batch([game_state])[0]
+
+    def encode_batch(self, game_states, out=None, dtype=None):
+        """Encode several positions at once into an (N, planes, rows, cols)
+        array of dtype, the encoder's own by default. The stone planes come from the boards' int8 stone
+        arrays with whole-array comparisons. Pass out, a preallocated array
+        of at least N entries, to reuse one buffer across batches.
+        """
+        num_states = len(game_states)
+        if out is None:
+            if dtype is None:
+                dtype = self.dtype
+            out = np.zeros((num_states,) + self.shape(), dtype=dtype)
+        batch = out[:num_states]
+
+        stones = np.stack([game_state.board.stone_array() for game_state in game_states])
+        players = np.fromiter((game_state.next_player.value for game_state in game_states),
+                              dtype=np.int8, count=num_states)[:, np.newaxis, np.newaxis]
         stone_color_offset = offset("stone_color")
-        
-        for point, go_string in game_state.board._grid.items():
-            if go_string is None:
-                continue
-            r = point.row - 1
-            c = point.col - 1
-            if go_string.color == next_player:
-                board_tensor[stone_color_offset][r][c] = 1
-                board_tensor[stone_color_offset + 2][r][c] = 0  # Not empty
-            elif go_string.color == opponent:
-                board_tensor[stone_color_offset + 1][r][c] = 1
-                board_tensor[stone_color_offset + 2][r][c] = 0  # Not empty
-        
-        # Set ones plane once (moved outside loop)
-        board_tensor[offset("ones")] = 1
-        
-        # Set player plane once (moved outside loop)
-        if self.use_player_plane and next_player == Player.black:
-            board_tensor[offset("current_player_color")] = 1
-        
-        # Set legal moves - optimized inline computation to avoid expensive deep copies
+        batch[:, stone_color_offset] = stones == players
+        batch[:, stone_color_offset + 1] = (stones != players) & (stones != 0)
+        batch[:, stone_color_offset + 2] = stones == 0
+        batch[:, offset("ones")] = 1
+
+        if self.use_player_plane:
+            batch[:, offset("current_player_color")] = players == Player.black.value
+
         if self.use_legal_moves:
-            if not game_state.is_over():
-                legal_moves_offset = offset("legal_moves")
-                board = game_state.board
-                
-                # Fast inline legal move checking without deep copies
-                for row in range(1, board.num_rows + 1):
-                    for col in range(1, board.num_cols + 1):
-                        point = Point(row, col)
-                        
-                        # Fast check: point must be empty
-                        if board._grid.get(point) is not None:
-                            continue
-                        
-                        # Check self-capture without deep copy
-                        has_liberty = False
-                        would_capture = False
-                        friendly_strings = []
-                        
-                        for neighbor in point.neighbors():
-                            if not board.is_on_grid(neighbor):
-                                continue
-                            neighbor_string = board._grid.get(neighbor)
-                            if neighbor_string is None:
-                                has_liberty = True
-                                break
-                            elif neighbor_string.color == next_player:
-                                friendly_strings.append(neighbor_string)
-                            else:  # opponent string
-                                if neighbor_string.num_liberties == 1:
-                                    would_capture = True
-                        
-                        # If has liberty, not self-capture
-                        if not has_liberty:
-                            # Check if all friendly strings would have no liberties
-                            if friendly_strings and all(s.num_liberties == 1 for s in friendly_strings):
-                                if not would_capture:
-                                    continue  # Self-capture, skip
-                        
-                        # Check ko violation - simplified heuristic for performance
-                        # Full ko check requires deep copy, so we use a fast heuristic:
-                        # If last move captured exactly one stone and we're trying to recapture
-                        # at that same position, it's likely a ko violation
-                        if would_capture and game_state.last_move and game_state.last_move.is_play:
-                            # Check if we're trying to play at the last move position
-                            # (which would be recapturing after a single-stone capture)
-                            if point == game_state.last_move.point:
-                                # Count how many stones we'd capture
-                                captured_stones = 0
-                                for neighbor in point.neighbors():
-                                    if not board.is_on_grid(neighbor):
-                                        continue
-                                    neighbor_string = board._grid.get(neighbor)
-                                    if neighbor_string and neighbor_string.color == opponent:
-                                        if neighbor_string.num_liberties == 1:
-                                            captured_stones += len(neighbor_string.stones)
-                                # If capturing exactly one stone at last move position, likely ko
-                                if captured_stones == 1:
-                                    continue  # Likely ko violation, skip
-                        
-                        # Valid move - set it
-                        r = row - 1
-                        c = col - 1
-                        board_tensor[legal_moves_offset][r][c] = 1
-
-        return board_tensor
+            legal_moves_offset = offset("legal_moves")
+            for game_state, planes in zip(game_states, batch):
+                planes[legal_moves_offset] = game_state.legal_move_mask()
+
+        return out
 
     def ones(self):
-        return np.ones((1, self.board_height, self.board_width))
+        return np.ones((1, self.board_height, self.board_width), dtype=self.dtype)
 
     def zeros(self):
-        return np.zeros((1, self.board_height, self.board_width))
+        return np.zeros((1, self.board_height, self.board_width), dtype=self.dtype)
 
     def encode_point(self, point):
         return self.board_width * (point.row - 1) + (point.col - 1)
@@ -149,5 +90,5 @@ class FourplaneEncoder(Encoder):
         return self.num_planes, self.board_height, self.board_width
 
 
-def create(board_size):
-    return FourplaneEncoder(board_size)
+def create(board_size, dtype=np.float64):
+    return FourplaneEncoder(board_size, dtype=dtype)
@@ -0,0 +1,144 @@
+from dlgo.encoders.base import Encoder
+from dlgo.gotypes import Point, Player
+import numpy as np
+
+__all__ = [
+    'HistoryBuffer',
+    'HistoryEncoder',
+]
+
+"""
+Feature name            num of planes   Description
+Stone history           2 * history     Player stones / opponent stones, for the
+                                        current position and each of the
+                                        history - 1 before it, newest first
+Colour                  1               A constant plane, 1 if black is to move
+
+The input of AlphaZero-style networks. Positions before the start of the
+game are all zeros.
+"""
+
+
+class HistoryBuffer:
+    """Ring buffer of the stone planes of the last history positions of a
+    game.
+
+    The stone planes of each position are written once, into 2 * history
+    slots. Every position is written to two slots, i and i + history, and
+    time runs downwards through the buffer, so the last history positions
+    always sit in one contiguous run of slots, newest first. view() returns
+    that run without copying. The buffer keeps each position in both
+    colour orders, so the player to move always comes first.
+
+    When a state follows the last one written, as when moving along a
+    game, only the new positions are written. Any other state rebuilds the
+    buffer from its last history positions.
+
+    A buffer is not thread-safe; use one per thread.
+    """
+    def __init__(self, board_size, history, dtype):
+        self.board_width, self.board_height = board_size
+        self.history = history
+        # [colour order][slot][first or second colour][row][col]; order 0 has
+        # black first, order 1 white first
+        self.planes = np.zeros((2, 2 * history, 2, self.board_height, self.board_width),
+                               dtype=dtype)
+        # number of positions written since the last reset, and the last one
+        self.time = 0
+        self.last_state = None
+
+    def view(self, game_state):
+        """The (2 * history, rows, cols) stone planes of game_state as a
+        view into the buffer. It is only valid until the next call."""
+        self.advance_to(game_state)
+        order = 0 if game_state.next_player == Player.black else 1
+        slot = -self.time % self.history
+        view = self.planes[order, slot:slot + self.history]
+        return view.reshape((2 * self.history, self.board_height, self.board_width))
+
+    def advance_to(self, game_state):
+        # the states since the last one written, newest first
+        new_states = []
+        state = game_state
+        while state is not None and state is not self.last_state and \
+                len(new_states) < self.history:
+            new_states.append(state)
+            state = state.previous_state
+        if self.last_state is None or state is not self.last_state:
+            # not a continuation: start over
+            self.planes[:] = 0
+            self.time = 0
+        for state in reversed(new_states):
+            self.push(state.board)
+        self.last_state = game_state
+
+    def push(self, board):
+        self.time += 1
+        stones = board.stone_array()
+        black = stones == Player.black.value
+        white = stones == Player.white.value
+        slot = -self.time % self.history
+        for index in (slot, slot + self.history):
+            self.planes[0, index, 0] = black
+            self.planes[0, index, 1] = white
+            self.planes[1, index, 0] = white
+            self.planes[1, index, 1] = black
+
+
+class HistoryEncoder(Encoder):
+    """Encodes the last history positions of a game from a HistoryBuffer.
+
+    Each encode_batch call uses a buffer of its own, so one encoder can be
+    shared between threads, as DataProcessor is in run_dataprocessor.py.
+    Within a call, encoding the states of a game in order writes each
+    position only once.
+    """
+    def __init__(self, board_size=(19, 19), history=8, dtype=np.float64):
+        self.board_width, self.board_height = board_size
+        self.history = history
+        self.num_planes = 2 * history + 1
+        self.dtype = dtype
+        self.binary = True
+
+    def name(self):
+        return 'history'
+
+    def encode(self, game_state):
+        return self.encode_batch([game_state])[0]
+
+    def encode_batch(self, game_states, out=None, dtype=None):
+        """Encode several positions into an (N, 2 * history + 1, rows, cols)
+        array of dtype, the encoder's own by default."""
+        num_states = len(game_states)
+        if out is None:
+            if dtype is None:
+                dtype = self.dtype
+            out = np.zeros((num_states,) + self.shape(), dtype=dtype)
+        buffer = self.new_buffer()
+        for game_state, planes in zip(game_states, out):
+            planes[:-1] = buffer.view(game_state)
+            planes[-1] = game_state.next_player == Player.black
+        return out
+
+    def new_buffer(self):
+        """A HistoryBuffer for this encoder, for callers such as agents that
+        want to keep one along a game."""
+        return HistoryBuffer((self.board_width, self.board_height), self.history, self.dtype)
+
+    def encode_point(self, point):
+        return self.board_width * (point.row - 1) + (point.col - 1)
+
+    def decode_point_index(self, index):
+        row = index // self.board_width
+        col = index % self.board_width
+        return Point(row=row + 1, col=col + 1)
+
+    def num_points(self):
+        return self.board_width * self.board_height
+
+    def shape(self):
+        return self.num_planes, self.board_height, self.board_width
+
+
+def create(board_size, dtype=np.float64, history=8):
+    return HistoryEncoder(board_size, history=history, dtype=dtype)
@@ -8,15 +8,19 @@ from dlgo.goboard import Point
 
 # tag::oneplane_encoder[]
 class OnePlaneEncoder(Encoder):
-    def __init__(self, board_size):
+    def __init__(self, board_size, dtype=np.float64):
         self.board_width, self.board_height = board_size
         self.num_planes = 1
+        # the plane holds -1, so the dtype has to be signed
+        if np.dtype(dtype).kind in 'ub':
+            raise ValueError('OnePlaneEncoder needs a signed dtype, got %s' % np.dtype(dtype))
+        self.dtype = dtype
 
     def name(self):  # <1>
         return 'oneplane'
 
     def encode(self, game_state):  # <2>
-        board_matrix = np.zeros(self.shape())
+        board_matrix = np.zeros(self.shape(), dtype=self.dtype)
         next_player = game_state.next_player
         for r in range(self.board_height):
             for c in range(self.board_width):
@@ -55,6 +59,6 @@ class OnePlaneEncoder(Encoder):
 
 
 # tag::oneplane_create[]
-def create(board_size):
-    return OnePlaneEncoder(board_size)
+def create(board_size, dtype=np.float64):
+    return OnePlaneEncoder(board_size, dtype=dtype)
 # end::oneplane_create[]
\ No newline at end of file
@@ -1,4 +1,6 @@
 import copy
+import random
+import numpy as np
 from dlgo import zobrist
 from dlgo.gotypes import Player
 from dlgo.gotypes import Point
@@ -11,18 +13,141 @@ __all__ = [
     'GoString'
 ]
 
+neighbor_tables = {}
+corner_tables = {}
+
+def init_neighbor_table(dim):
+    rows, cols = dim
+    new_table = {}
+    for r in range(1, rows + 1):
+        for c in range(1, cols + 1):
+            p = Point(row=r, col=c)
+            new_table[p] = [
+                n for n in p.neighbors()
+                if 1 <= n.row <= rows and 1 <= n.col <= cols]
+    neighbor_tables[dim] = new_table
+
+def init_corner_table(dim):
+    rows, cols = dim
+    new_table = {}
+    for r in range(1, rows + 1):
+        for c in range(1, cols + 1):
+            p = Point(row=r, col=c)
+            full_corners = [
+                Point(row=p.row - 1, col=p.col - 1),
+                Point(row=p.row - 1, col=p.col + 1),
+                Point(row=p.row + 1, col=p.col - 1),
+                Point(row=p.row + 1, col=p.col + 1),
+            ]
+            new_table[p] = [
+                n for n in full_corners
+                if 1 <= n.row <= rows and 1 <= n.col <= cols]
+    corner_tables[dim] = new_table
+
 class Board():
     def __init__(self, num_rows, num_cols):
         self.num_rows = num_rows
         self.num_cols = num_cols
         self._grid = {}
         self._hash = zobrist.EMPTY_BOARD
+        dim = (num_rows, num_cols)
+        if dim not in neighbor_tables:
+            init_neighbor_table(dim)
+        if dim not in corner_tables:
+            init_corner_table(dim)
+        self.neighbor_table = neighbor_tables[dim]
+        self.corner_table = corner_tables[dim]
+        # the empty points in no particular order, and each one's index in
+        # the list, so points can be removed by swapping with the last
+        self._empty = list(self.neighbor_table)
+        self._empty_index = {point: i for i, point in enumerate(self._empty)}
+        # (point, color) -> is_eye result, dropped around every change
+        self._eye_cache = {}
+        # Player.value of the stone on each point, 0 if empty
+        self._stones = np.zeros((num_rows, num_cols), dtype=np.int8)
+        # liberties of the string on each point, 0 if empty
+        self._liberties = np.zeros((num_rows, num_cols), dtype=np.int16)
+        # number of stones placed so far, and the value it had when the
+        # stone on each point was placed
+        self._num_placed = 0
+        self._placed_at = np.zeros((num_rows, num_cols), dtype=np.int32)
+        # evaluation features, kept up to date as stones are placed and
+        # captured: stones, liberties summed over strings, strings in
+        # atari, and empty points whose stone neighbours are all one
+        # colour (a rough territory estimate)
+        self._stone_counts = {Player.black: 0, Player.white: 0}
+        self._liberty_counts = {Player.black: 0, Player.white: 0}
+        self._atari_counts = {Player.black: 0, Player.white: 0}
+        self._territory_counts = {Player.black: 0, Player.white: 0}
+        self._territory = {}
+
+    def __deepcopy__(self, memo):
+        # strings are immutable, so the copy can share them
+        board = copy.copy(self)
+        board._grid = dict(self._grid)
+        board._stone_counts = dict(self._stone_counts)
+        board._liberty_counts = dict(self._liberty_counts)
+        board._atari_counts = dict(self._atari_counts)
+        board._territory_counts = dict(self._territory_counts)
+        board._territory = dict(self._territory)
+        board._empty = list(self._empty)
+        board._empty_index = dict(self._empty_index)
+        board._eye_cache = dict(self._eye_cache)
+        board._stones = self._stones.copy()
+        board._liberties = self._liberties.copy()
+        board._placed_at = self._placed_at.copy()
+        return board
+
+    def _add_empty(self, point):
+        self._empty_index[point] = len(self._empty)
+        self._empty.append(point)
+
+    def _remove_empty(self, point):
+        index = self._empty_index.pop(point)
+        last = self._empty.pop()
+        if last != point:
+            self._empty[index] = last
+            self._empty_index[last] = index
+
+    def random_empty_points(self):
+        """Yield the empty points in random order. Each step swaps one
+        point to the back of the empty-point list, so stopping early costs
+        nothing.
+        """
+        empty = self._empty
+        index = self._empty_index
+        remaining = len(empty)
+        while remaining > 0:
+            i = random.randrange(remaining)
+            remaining -= 1
+            point = empty[i]
+            last = empty[remaining]
+            empty[i] = last
+            empty[remaining] = point
+            index[last] = i
+            index[point] = remaining
+            yield point
+
+    def _add_string(self, string):
+        self._liberty_counts[string.color] += string.num_liberties
+        if string.num_liberties == 1:
+            self._atari_counts[string.color] += 1
+
+    def _drop_string(self, string):
+        self._liberty_counts[string.color] -= string.num_liberties
+        if string.num_liberties == 1:
+            self._atari_counts[string.color] -= 1
 
     def _replace_string(self, new_string):
+        self._drop_string(self._grid[next(iter(new_string.stones))])
+        self._add_string(new_string)
         for point in new_string.stones:
             self._grid[point] = new_string
+            self._liberties[point.row - 1, point.col - 1] = new_string.num_liberties
 
     def _remove_string(self, string):
+        self._drop_string(string)
+        self._stone_counts[string.color] -= len(string.stones)
         for point in string.stones:
             for neighbor in point.neighbors():
                 neighbor_string = self._grid.get(neighbor)
@@ -31,8 +156,29 @@ class Board():
                 if neighbor_string is not string:
                     self._replace_string(neighbor_string.with_liberty(point))
             self._grid[point] = None
+            self._stones[point.row - 1, point.col - 1] = 0
+            self._liberties[point.row - 1, point.col - 1] = 0
+            self._add_empty(point)
             self._hash ^= zobrist.HASH_CODE[point, string.color]
 
+    def _update_territory(self, points):
+        for point in points:
+            owner = None
+            if self._grid.get(point) is None:
+                colors = set()
+                for neighbor in point.neighbors():
+                    neighbor_string = self._grid.get(neighbor)
+                    if neighbor_string is not None:
+                        colors.add(neighbor_string.color)
+                if len(colors) == 1:
+                    owner = colors.pop()
+            old_owner = self._territory.pop(point, None)
+            if old_owner is not None:
+                self._territory_counts[old_owner] -= 1
+            if owner is not None:
+                self._territory[point] = owner
+                self._territory_counts[owner] += 1
+
     def zobrist_hash(self):
         return self._hash
 
@@ -56,16 +202,40 @@ class Board():
                     adjacent_opposite_color.append(neighbor_string)
         new_string = GoString(player, [point], liberties)
         for same_color_string in adjacent_same_color:
+            self._drop_string(same_color_string)
             new_string = new_string.merged_with(same_color_string)
+        self._add_string(new_string)
+        self._stone_counts[player] += 1
+        self._remove_empty(point)
+        self._stones[point.row - 1, point.col - 1] = player.value
+        self._num_placed += 1
+        self._placed_at[point.row - 1, point.col - 1] = self._num_placed
         for new_string_point in new_string.stones:
             self._grid[new_string_point] = new_string
+            self._liberties[new_string_point.row - 1, new_string_point.col - 1] = \
+                new_string.num_liberties
         self._hash ^= zobrist.HASH_CODE[point, player]
+        changed = [point]
         for other_color_string in adjacent_opposite_color:
             replacement = other_color_string.without_liberty(point)
             if replacement.num_liberties:
                 self._replace_string(other_color_string.without_liberty(point))
             else:
                 self._remove_string(other_color_string)
+                changed.extend(other_color_string.stones)
+        affected = set()
+        for changed_point in changed:
+            affected.add(changed_point)
+            for neighbor in changed_point.neighbors():
+                if self.is_on_grid(neighbor):
+                    affected.add(neighbor)
+        self._update_territory(affected)
+        # eye status depends on the diagonals as well
+        for changed_point in changed:
+            for nearby in [changed_point] + self.neighbor_table[changed_point] + \
+                    self.corner_table[changed_point]:
+                self._eye_cache.pop((nearby, Player.black), None)
+                self._eye_cache.pop((nearby, Player.white), None)
 
     def is_on_grid(self, point):
         return 1 <= point.row <= self.num_rows and \
@@ -83,6 +253,127 @@ class Board():
             return None
         return string
 
+    def stone_array(self):
+        """The board as a (num_rows, num_cols) int8 array holding the
+        Player.value of each stone and 0 for empty points. This is the
+        board's own array, so don't modify it.
+        """
+        return self._stones
+
+    def liberty_array(self):
+        """Like stone_array, with the liberties of each stone's string."""
+        return self._liberties
+
+    def stone_ages(self):
+        """int32 array of how many stones were placed since each stone on
+        the board, counting the stone itself, 0 for empty points."""
+        return np.where(self._stones != 0, self._num_placed + 1 - self._placed_at, 0)
+
+    def move_summary(self, player, point):
+        """What player's stone at the empty point would do, worked out from
+        the neighbouring strings without placing it: returns the number of
+        stones it captures, and the liberties and the number of stones of
+        the string it ends up in.
+        """
+        friendly = []
+        captured = []
+        liberties = set()
+        for neighbor in self.neighbor_table[point]:
+            string = self._grid.get(neighbor)
+            if string is None:
+                liberties.add(neighbor)
+            elif string.color == player:
+                if string not in friendly:
+                    friendly.append(string)
+            elif string.num_liberties == 1 and string not in captured:
+                captured.append(string)
+        stones = {point}
+        for string in friendly:
+            stones |= string.stones
+            liberties |= string.liberties
+        liberties.discard(point)
+        num_captured = 0
+        for string in captured:
+            num_captured += len(string.stones)
+            # captured stones next to the new string become its liberties
+            for stone in string.stones:
+                for neighbor in self.neighbor_table[stone]:
+                    if neighbor in stones:
+                        liberties.add(stone)
+                        break
+        return num_captured, len(liberties), len(stones)
+
+    def is_self_capture(self, player, point):
+        """Would player's stone at the empty point have no liberties?
+        Answered from the neighbouring strings without placing it.
+        """
+        for neighbor in self.neighbor_table[point]:
+            string = self._grid.get(neighbor)
+            if string is None:
+                return False
+            if string.color == player:
+                if string.num_liberties > 1:
+                    return False
+            elif string.num_liberties == 1:
+                # captures, which frees this point's neighbour
+                return False
+        return True
+
+    def hash_after(self, player, point):
+        """Zobrist hash after player plays at the empty point."""
+        new_hash = self._hash ^ zobrist.HASH_CODE[point, player]
+        captured = []
+        for neighbor in self.neighbor_table[point]:
+            string = self._grid.get(neighbor)
+            if string is not None and string.color != player and \
+                    string.num_liberties == 1 and string not in captured:
+                captured.append(string)
+                for stone in string.stones:
+                    new_hash ^= zobrist.HASH_CODE[stone, string.color]
+        return new_hash
+
+    def is_eye(self, point, color):
+        """Same test as agent.helpers.is_point_an_eye, cached per board."""
+        key = (point, color)
+        result = self._eye_cache.get(key)
+        if result is None:
+            result = self._compute_eye(point, color)
+            self._eye_cache[key] = result
+        return result
+
+    def _compute_eye(self, point, color):
+        if self._grid.get(point) is not None:
+            return False
+        for neighbor in self.neighbor_table[point]:
+            string = self._grid.get(neighbor)
+            if string is None or string.color != color:
+                return False
+        corners = self.corner_table[point]
+        friendly_corners = 0
+        for corner in corners:
+            string = self._grid.get(corner)
+            if string is not None and string.color == color:
+                friendly_corners += 1
+        off_board_corners = 4 - len(corners)
+        if off_board_corners > 0:
+            return off_board_corners + friendly_corners == 4
+        return friendly_corners >= 3
+
+    def num_stones(self, player):
+        return self._stone_counts[player]
+
+    def num_liberties(self, player):
+        """Liberties of player's strings, summed over the strings."""
+        return self._liberty_counts[player]
+
+    def num_atari(self, player):
+        """Number of player's strings with a single liberty."""
+        return self._atari_counts[player]
+
+    def num_territory(self, player):
+        """Empty points whose neighbouring stones all belong to player."""
+        return self._territory_counts[player]
+
 class Move():
     def __init__(self, point=None, is_pass=False, is_resign=False):
         assert (point is not None) ^ is_pass ^ is_resign
@@ -103,6 +394,24 @@ class Move():
     def resign(cls):
         return Move(is_resign=True)
 
+    def __hash__(self):
+        return hash((
+            self.is_play,
+            self.is_pass,
+            self.is_resign,
+            self.point))
+
+    def __eq__(self, other):
+        return isinstance(other, Move) and (
+            self.is_play,
+            self.is_pass,
+            self.is_resign,
+            self.point) == (
+            other.is_play,
+            other.is_pass,
+            other.is_resign,
+            other.point)
+
 # Chain of connected stones (used to e.g. efficiently check for liberties)
 class GoString():
     def __init__(self, color, stones, liberties):
@@ -149,6 +458,8 @@ class GameState():
                 previous.previous_states |
                 {(previous.next_player, previous.board.zobrist_hash())})
         self.last_move = move
+        # filled in by legal_move_mask() on first use
+        self._legal_mask = None
 
     def apply_move(self, move):
         if move.is_play:
@@ -158,6 +469,23 @@ class GameState():
             next_board = self.board
         return GameState(next_board, self.next_player.other, self, move)
 
+    def detached(self):
+        """A copy of this state cut off from its chain of previous states,
+        for sending to another process. Pickling the chain costs time and
+        memory in the length of the game, and recursion depth: a long
+        19x19 game no longer pickles at all. The copy keeps the previous
+        move and the ko history, so legality, is_over and winner are
+        unchanged.
+        """
+        state = copy.copy(self)
+        if self.previous_state is not None:
+            previous = copy.copy(self.previous_state)
+            previous.previous_state = None
+            previous.previous_states = frozenset()
+            previous._legal_mask = None
+            state.previous_state = previous
+        return state
+
     def is_over(self):
         if self.last_move is None:
             return False
@@ -171,16 +499,16 @@ class GameState():
     def is_move_self_capture(self, player, move):
         if not move.is_play:
             return False
-        next_board = copy.deepcopy(self.board)
-        next_board.place_stone(player, move.point)
-        new_string = next_board.get_go_string(move.point)
-        return new_string.num_liberties == 0
+        return self.board.is_self_capture(player, move.point)
 
     def is_valid_move(self, move):
         if self.is_over():
             return False
         if move.is_pass or move.is_resign:
             return True
+        if self._legal_mask is not None:
+            point = move.point
+            return bool(self._legal_mask[point.row - 1, point.col - 1])
         return (
             self.board.get(move.point) is None and
             not self.is_move_self_capture(self.next_player, move) and
@@ -189,15 +517,32 @@ class GameState():
     def legal_moves(self):
         if self.is_over():
             return []
-        moves = []
-        for row in range(1, self.board.num_rows + 1):
-            for col in range(1, self.board.num_cols + 1):
-                move = Move.play(Point(row, col))
-                if self.is_valid_move(move):
-                    moves.append(move)
+        rows, cols = np.nonzero(self.legal_move_mask())
+        moves = [Move.play(Point(row + 1, col + 1))
+                 for row, col in zip(rows.tolist(), cols.tolist())]
         moves.append(Move.pass_turn())
         moves.append(Move.resign())
         return moves
+
+    def legal_move_mask(self):
+        """Boolean (num_rows, num_cols) array of the points the player to
+        move can play, with the exact self-capture and ko checks of
+        is_valid_move. It is computed once and kept on the state, so the
+        encoders, agents and policy masking all share it; don't modify it.
+        All False once the game is over.
+        """
+        if self._legal_mask is None:
+            board = self.board
+            mask = np.zeros((board.num_rows, board.num_cols), dtype=bool)
+            if not self.is_over():
+                player = self.next_player
+                for point in board._empty:
+                    move = Move.play(point)
+                    if not self.is_move_self_capture(player, move) and \
+                            not self.does_move_violate_ko(player, move):
+                        mask[point.row - 1, point.col - 1] = True
+            self._legal_mask = mask
+        return self._legal_mask
     
     def winner(self):
         if not self.is_over():
@@ -221,7 +566,5 @@ class GameState():
     def does_move_violate_ko(self, player, move):
         if not move.is_play:
             return False
-        next_board = copy.deepcopy(self.board)
-        next_board.place_stone(player, move.point)
-        next_situation = (player.other, next_board.zobrist_hash())
+        next_situation = (player.other, self.board.hash_after(player, move.point))
         return next_situation in self.previous_states
\ No newline at end of file
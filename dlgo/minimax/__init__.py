@@ -1,3 +1,7 @@
 from .alphabetaprune import *
 from .depthprune import *
-from .minimax import *
\ No newline at end of file
+from .evaluation import *
+from .minimax import *
+from .parallel import *
+from .solver import *
+from .transposition import *
\ No newline at end of file
@@ -1,17 +1,104 @@
 import random
+import time
 
 from dlgo.agent import Agent
 from dlgo.gotypes import Player
+from dlgo.minimax.transposition import EXACT, LOWER, UPPER
 
 __all__ = [
     'AlphaBetaAgent',
+    'MoveOrdering',
+    'alpha_beta_result',
+    'negamax',
 ]
 
 MAX = 999999
 MIN = -999999
 
 
-def alpha_beta_result(game_state, max_depth, best_black, best_white, eval_fn):
+class SearchTimeout(Exception):
+    pass
+
+
+def is_capture(board, player, move):
+    if not move.is_play:
+        return False
+    for neighbor in move.point.neighbors():
+        string = board.get_go_string(neighbor)
+        if string is not None and string.color != player and string.num_liberties == 1:
+            return True
+    return False
+
+
+class MoveOrdering:
+    """Move ordering state shared by the iterations of one search.
+
+    Moves are tried in this order: the best move found for the position
+    by an earlier iteration (a transposition table keyed by player and
+    Zobrist hash), captures, the killer moves that caused a cutoff at the
+    same ply, and then by history score. Pass and resign go last.
+
+    It also counts the nodes the search visits. With a TranspositionTable,
+    negamax stores its results there as well and reuses them, and the
+    table's best move comes first.
+    """
+    def __init__(self, deadline=None, table=None):
+        self.deadline = deadline
+        self.table = table
+        self.nodes = 0
+        self.best_moves = {}
+        # ply -> the last two moves that caused a cutoff there
+        self.killers = {}
+        # (player, point) -> sum of depth^2 over the cutoffs it caused
+        self.history = {}
+
+    def visit(self):
+        self.nodes += 1
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+    def order(self, game_state, ply):
+        player = game_state.next_player
+        board = game_state.board
+        best_move = self.best_moves.get((player, board.zobrist_hash()))
+        if self.table is not None:
+            entry = self.table.probe(game_state)
+            if entry is not None and entry.move is not None:
+                best_move = entry.move
+        killers = self.killers.get(ply, ())
+
+        def key(move):
+            if not move.is_play:
+                return (0, 0, 0, 0, 0)
+            return (
+                1,
+                move == best_move,
+                is_capture(board, player, move),
+                move in killers,
+                self.history.get((player, move.point), 0),
+            )
+        return sorted(game_state.legal_moves(), key=key, reverse=True)
+
+    def record_best(self, game_state, move):
+        self.best_moves[game_state.next_player, game_state.board.zobrist_hash()] = move
+
+    def record_cutoff(self, game_state, move, ply, depth):
+        self.record_best(game_state, move)
+        if not move.is_play:
+            return
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        key = (game_state.next_player, move.point)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+
+def alpha_beta_result(game_state, max_depth, best_black, best_white, eval_fn,
+                      ordering=None, ply=0):
+    if ordering is not None:
+        ordering.visit()
+
     if game_state.is_over():
         if game_state.winner() == game_state.next_player:
             return MAX
@@ -22,13 +109,21 @@ def alpha_beta_result(game_state, max_depth, best_black, best_white, eval_fn):
     if max_depth == 0:
         return eval_fn(game_state)
 
+    if ordering is None:
+        moves = game_state.legal_moves()
+    else:
+        moves = ordering.order(game_state, ply)
+
     best_result_so_far = MIN
-    for move in game_state.legal_moves():
+    best_move = None
+    for move in moves:
         next_game_state = game_state.apply_move(move)
-        opponent_best_result = alpha_beta_result(next_game_state, max_depth=max_depth-1, eval_fn=eval_fn, best_black=best_black, best_white=best_white)
+        opponent_best_result = alpha_beta_result(next_game_state, max_depth=max_depth-1, eval_fn=eval_fn, best_black=best_black, best_white=best_white,
+                                                 ordering=ordering, ply=ply+1)
         our_best_result = -1*opponent_best_result
         if our_best_result > best_result_so_far:
             best_result_so_far = our_best_result
+            best_move = move
 
         '''
             Here's the GPT explaination of how the pruning code works
@@ -50,6 +145,8 @@ def alpha_beta_result(game_state, max_depth, best_black, best_white, eval_fn):
                 best_white = best_result_so_far                       
             outcome_for_black = -1 * best_result_so_far               
             if outcome_for_black < best_black:                 
+                if ordering is not None:
+                    ordering.record_cutoff(game_state, move, ply, max_depth)
                 return best_result_so_far                             
 
         elif game_state.next_player == Player.black:
@@ -57,40 +154,173 @@ def alpha_beta_result(game_state, max_depth, best_black, best_white, eval_fn):
                 best_black = best_result_so_far                       
             outcome_for_white = -1 * best_result_so_far               
             if outcome_for_white < best_white:                 
+                if ordering is not None:
+                    ordering.record_cutoff(game_state, move, ply, max_depth)
                 return best_result_so_far 
             
+    if ordering is not None and best_move is not None:
+        ordering.record_best(game_state, best_move)
     return best_result_so_far
     
 
+def negamax(game_state, depth, alpha, beta, eval_fn, ordering, ply=0):
+    """Fail-soft negamax alpha-beta with principal variation search.
+
+    Scores are for the player to move. The first move is searched with the
+    full (alpha, beta) window, the rest with a null window around alpha,
+    and only re-searched with the full window if they turn out to be
+    better.
+    """
+    ordering.visit()
+
+    if game_state.is_over():
+        if game_state.winner() == game_state.next_player:
+            return MAX
+        if game_state.winner() is None:
+            return eval_fn(game_state)
+        return MIN
+
+    if depth == 0:
+        return eval_fn(game_state)
+
+    table = ordering.table
+    if table is not None:
+        entry = table.probe(game_state)
+        if entry is not None and entry.depth >= depth:
+            if entry.flag == EXACT or \
+                    (entry.flag == LOWER and entry.score >= beta) or \
+                    (entry.flag == UPPER and entry.score <= alpha):
+                return entry.score
+    original_alpha = alpha
+
+    best_score = None
+    best_move = None
+    for move in ordering.order(game_state, ply):
+        next_game_state = game_state.apply_move(move)
+        if best_move is None:
+            score = -negamax(next_game_state, depth - 1, -beta, -alpha, eval_fn, ordering, ply + 1)
+        else:
+            score = -negamax(next_game_state, depth - 1, -alpha - 1, -alpha, eval_fn, ordering, ply + 1)
+            if alpha < score < beta:
+                score = -negamax(next_game_state, depth - 1, -beta, -alpha, eval_fn, ordering, ply + 1)
+        if best_score is None or score > best_score:
+            best_score = score
+            best_move = move
+        if best_score > alpha:
+            alpha = best_score
+        if alpha >= beta:
+            break
+
+    if alpha >= beta:
+        ordering.record_cutoff(game_state, best_move, ply, depth)
+    else:
+        ordering.record_best(game_state, best_move)
+    if table is not None:
+        if best_score >= beta:
+            flag = LOWER
+        elif best_score <= original_alpha:
+            flag = UPPER
+        else:
+            flag = EXACT
+        table.store(game_state, depth, flag, best_score, best_move)
+    return best_score
+
+
 # tag::alpha-beta-agent[]
 class AlphaBetaAgent(Agent):
-    def __init__(self, max_depth, eval_fn):
+    """Negamax alpha-beta search deepened one ply at a time up to
+    max_depth, or for as long as time_limit seconds allow. Each iteration
+    tries moves in the order learned by the previous ones (see
+    MoveOrdering) and searches within an aspiration window of
+    +/- aspiration around the previous iteration's score, falling back to
+    a full window when the score lands outside it. The best move of the
+    deepest completed iteration is played, chosen at random among the
+    moves that share the best score.
+    """
+    def __init__(self, max_depth, eval_fn, opening_book=None, time_limit=None, aspiration=2):
         Agent.__init__(self)
+        if max_depth is None and time_limit is None:
+            raise ValueError('AlphaBetaAgent needs a max_depth or a time_limit')
         self.max_depth = max_depth
         self.eval_fn = eval_fn
+        # OpeningBook consulted before searching
+        self.opening_book = opening_book
+        # seconds per move; the first iteration always completes
+        self.time_limit = time_limit
+        # half width of the aspiration window, None to always search
+        # with a full window
+        self.aspiration = aspiration
+        # depth of the last completed iteration and nodes visited by the
+        # last search
+        self.depth_reached = None
+        self.nodes = 0
 
     def select_move(self, game_state):
-        # keep a best moves list
-        best_moves = []
-        # keep a best global scorre, a best white and a best black score
+        if self.opening_book is not None:
+            book_move = self.opening_book.select_move(game_state)
+            if book_move is not None:
+                return book_move
+
+        start = time.perf_counter()
+        ordering = MoveOrdering()
+        moves = ordering.order(game_state, 0)
+        best_move = None
+        score = None
+        depth = 0
+        while self.max_depth is None or depth <= self.max_depth:
+            try:
+                score, depth_best_move, scores = self.search_with_aspiration(
+                    game_state, moves, depth, score, ordering)
+            except SearchTimeout:
+                break
+            best_move = depth_best_move
+            self.depth_reached = depth
+            # the next iteration starts with the best moves of this one
+            moves = sorted(moves, key=lambda move: scores.get(move, MIN - 1), reverse=True)
+            ordering.record_best(game_state, best_move)
+            if self.time_limit is not None:
+                ordering.deadline = start + self.time_limit
+            depth += 1
+        self.nodes = ordering.nodes
+        return best_move
+
+    def search_with_aspiration(self, game_state, moves, depth, previous_score, ordering):
+        if self.aspiration is not None and previous_score is not None:
+            alpha = previous_score - self.aspiration
+            beta = previous_score + self.aspiration
+            result = self.search_root(game_state, moves, depth, alpha, beta, ordering)
+            if alpha < result[0] < beta:
+                return result
+        return self.search_root(game_state, moves, depth, MIN - 1, MAX + 1, ordering)
+
+    def search_root(self, game_state, moves, depth, alpha, beta, ordering):
+        """Search the root moves with negamax, the children to depth.
+        Returns the best score, one of the moves with that score picked at
+        random, and the score (or bound) found for each move searched.
+
+        Moves after the first are probed with a null window just below the
+        best score, so that a move that ties with it is searched exactly
+        as well and can be told apart from a worse one.
+        """
+        scores = {}
         best_score = None
-        best_white_score = MIN
-        best_black_score = MIN
-
-        # we calculate our best result
-        # we still need to maintain best moves and select random best move
-        for move in game_state.legal_moves():
-            our_move = game_state.apply_move(move)
-            opponent_best_result = alpha_beta_result(our_move, self.max_depth, best_black_score, best_white_score, self.eval_fn)
-            our_best_result = -1*opponent_best_result
-            if (not best_moves) or our_best_result > best_score:
+        best_moves = []
+        for move in moves:
+            next_game_state = game_state.apply_move(move)
+            if not best_moves:
+                score = -negamax(next_game_state, depth, -beta, -alpha, self.eval_fn, ordering, 1)
+            else:
+                score = -negamax(next_game_state, depth, -alpha, -alpha + 1, self.eval_fn, ordering, 1)
+                if alpha <= score < beta:
+                    score = -negamax(next_game_state, depth, -beta, -alpha + 1, self.eval_fn, ordering, 1)
+            scores[move] = score
+            if best_score is None or score > best_score:
+                best_score = score
                 best_moves = [move]
-                best_score = our_best_result
-                if game_state.next_player == Player.white:
-                    best_white_score = our_best_result
-
-                if game_state.next_player == Player.black:
-                    best_black_score = our_best_result
-            elif our_best_result == best_score:
+            elif score == best_score:
                 best_moves.append(move)
-        return random.choice(best_moves)
\ No newline at end of file
+            if best_score > alpha:
+                alpha = best_score
+            if alpha >= beta:
+                break
+        return best_score, random.choice(best_moves), scores
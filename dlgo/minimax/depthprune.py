@@ -1,3 +1,4 @@
+import multiprocessing
 import random
 
 from dlgo.agent import Agent
@@ -31,11 +32,26 @@ def best_result(game_state, max_depth, eval_fn):
     return best_result_so_far
     
 
+def _root_move_result(args):
+    game_state, move, max_depth, eval_fn = args
+    return best_result(game_state.apply_move(move), max_depth, eval_fn)
+
+
 class DepthPrunedAgent(Agent):
-    def __init__(self, max_depth, eval_fn):
+    def __init__(self, max_depth, eval_fn, num_workers=None):
         Agent.__init__(self)
         self.max_depth = max_depth
         self.eval_fn = eval_fn
+        # evaluate the root moves on a pool of num_workers processes;
+        # eval_fn has to be picklable, e.g. a module level function
+        self.num_workers = num_workers
+        self.pool = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
   
     def select_move(self, game_state):
         # keep a best moves list
@@ -43,11 +59,20 @@ class DepthPrunedAgent(Agent):
         # keep a best score
         best_score = None
 
+        moves = game_state.legal_moves()
+        # the workers get the position without the game history behind it
+        position = game_state.detached()
+        tasks = [(position, move, self.max_depth, self.eval_fn) for move in moves]
+        if self.num_workers is None:
+            results = map(_root_move_result, tasks)
+        else:
+            if self.pool is None:
+                self.pool = multiprocessing.Pool(self.num_workers)
+            results = self.pool.map(_root_move_result, tasks)
+
         # we calculate our best result
         # we still need to maintain best moves and select random best move
-        for move in game_state.legal_moves():
-            our_move = game_state.apply_move(move)
-            opponent_best_result = best_result(our_move, self.max_depth, self.eval_fn)
+        for move, opponent_best_result in zip(moves, results):
             our_best_result = -1*opponent_best_result
             if (not best_moves) or our_best_result > best_score:
                 best_moves = [move]
@@ -0,0 +1,85 @@
+"""Evaluation functions for the minimax agents.
+
+Each feature reads counts that the board keeps up to date as stones are
+placed and captured, so evaluating a leaf does not scan the board. All
+scores are from the point of view of the player to move, as eval_fn is
+expected to return.
+"""
+
+from dlgo.tactics import TacticalReader
+
+__all__ = [
+    'WeightedEval',
+    'atari_diff',
+    'capture_diff',
+    'ladder_diff',
+    'liberty_diff',
+    'territory_diff',
+]
+
+_reader = TacticalReader(max_nodes=100)
+
+
+def capture_diff(game_state):
+    """Own stones minus the opponent's."""
+    board = game_state.board
+    player = game_state.next_player
+    return board.num_stones(player) - board.num_stones(player.other)
+
+
+def liberty_diff(game_state):
+    board = game_state.board
+    player = game_state.next_player
+    return board.num_liberties(player) - board.num_liberties(player.other)
+
+
+def atari_diff(game_state):
+    """Opponent strings in atari minus own ones."""
+    board = game_state.board
+    player = game_state.next_player
+    return board.num_atari(player.other) - board.num_atari(player)
+
+
+def territory_diff(game_state):
+    board = game_state.board
+    player = game_state.next_player
+    return board.num_territory(player) - board.num_territory(player.other)
+
+
+def ladder_diff(game_state):
+    """Stones of opponent strings that the player to move can capture,
+    minus own stones in atari that cannot be saved, as read by
+    TacticalReader. Unlike the features above this is not O(1): it reads
+    every string with two liberties or fewer, at tens of microseconds a
+    read, so it costs far more per leaf than the other features. Keep it
+    for shallow searches or root move evaluation rather than the leaves
+    of a deep AlphaBetaAgent search.
+    """
+    board = game_state.board
+    player = game_state.next_player
+    score = 0
+    seen = set()
+    for string in board._grid.values():
+        if string is None or string.num_liberties > 2 or string.stones in seen:
+            continue
+        seen.add(string.stones)
+        point = next(iter(string.stones))
+        if string.color != player:
+            if _reader.can_capture(board, point):
+                score += len(string.stones)
+        elif string.num_liberties == 1:
+            if _reader.can_escape(board, point) is False:
+                score -= len(string.stones)
+    return score
+
+
+class WeightedEval:
+    """Weighted sum of evaluation features, usable as an eval_fn.
+
+    eval_fn = WeightedEval([(capture_diff, 1.0), (atari_diff, 0.5)])
+    """
+    def __init__(self, features):
+        self.features = list(features)
+
+    def __call__(self, game_state):
+        return sum(weight * feature(game_state) for feature, weight in self.features)
@@ -14,9 +14,9 @@ class GameResult(enum.Enum):
     win = 3
 
 def reverse_game_result(game_result):
-    if game_result.win:
+    if game_result == GameResult.win:
         return GameResult.loss
-    elif game_result.loss:
+    elif game_result == GameResult.loss:
         return GameResult.win
     else:
         return GameResult.draw
@@ -45,6 +45,12 @@ def best_result(game_state):
 
     
 class MinimaxAgent(Agent):
+    def __init__(self, solver=None):
+        Agent.__init__(self)
+        # ProofNumberSolver used in place of the plain recursion; positions
+        # it cannot solve within its node budget count as draws
+        self.solver = solver
+
     def select_move(self, game_state):
         winning_moves = []
         losing_moves = []
@@ -56,14 +62,17 @@ class MinimaxAgent(Agent):
         # usually players kind of resign if they see a losing game -> so better resign
         for move in game_state.legal_moves():
             next_game_state = game_state.apply_move(move)
-            opponent_best_result = best_result(next_game_state)
+            if self.solver is not None:
+                opponent_best_result = self.solver.solve(next_game_state) or GameResult.draw
+            else:
+                opponent_best_result = best_result(next_game_state)
             our_best_result = reverse_game_result(opponent_best_result)
             if our_best_result == GameResult.win:
-                winning_moves.append(our_best_result)
+                winning_moves.append(move)
             elif our_best_result == GameResult.draw:
-                draw_moves.append(our_best_result)
+                draw_moves.append(move)
             else:
-                losing_moves.append(our_best_result)
+                losing_moves.append(move)
         if winning_moves:
             return random.choice(winning_moves)
         elif draw_moves:
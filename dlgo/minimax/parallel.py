@@ -0,0 +1,145 @@
+import multiprocessing
+import time
+
+from dlgo.minimax.alphabetaprune import AlphaBetaAgent, MoveOrdering, SearchTimeout, \
+    negamax, MAX, MIN
+from dlgo.minimax.transposition import TranspositionTable
+
+__all__ = [
+    'ParallelAlphaBetaAgent',
+]
+
+# per-process state of the pool workers
+_worker = {}
+
+
+def _init_worker(table_name, table_size, num_cols, eval_fn):
+    table = TranspositionTable(table_size, num_cols, name=table_name)
+    _worker['table'] = table
+    _worker['ordering'] = MoveOrdering(table=table)
+    _worker['eval_fn'] = eval_fn
+
+
+def _search_root_move(args):
+    """Search one root move to depth. Moves after the first are probed with
+    a null window at the best root score so far, read from the shared
+    table, and only searched with the full window if they beat it. The
+    score is None if the search ran past deadline.
+    """
+    game_state, move, depth, deadline = args
+    table = _worker['table']
+    ordering = _worker['ordering']
+    eval_fn = _worker['eval_fn']
+    ordering.nodes = 0
+    ordering.deadline = deadline
+
+    next_game_state = game_state.apply_move(move)
+    alpha = table.root_score
+    beta = MAX + 1
+    try:
+        if alpha < MIN:
+            score = -negamax(next_game_state, depth, -beta, -alpha, eval_fn, ordering, 1)
+        else:
+            score = -negamax(next_game_state, depth, -alpha - 1, -alpha, eval_fn, ordering, 1)
+            if alpha < score < beta:
+                score = -negamax(next_game_state, depth, -beta, -alpha, eval_fn, ordering, 1)
+    except SearchTimeout:
+        score = None
+    return move, score, ordering.nodes
+
+
+class ParallelAlphaBetaAgent(AlphaBetaAgent):
+    """AlphaBetaAgent that splits the root moves across a process pool.
+
+    The workers share a TranspositionTable in shared memory, so the
+    results one worker finds speed up the others, as in Lazy SMP. Each
+    iteration searches the first root move alone to get a score, then
+    hands out the rest; the best score so far is published in the table
+    and every new root move is searched against it.
+
+    As with AlphaBetaAgent, the search goes to max_depth or stops at
+    time_limit seconds, and the first iteration always completes. The
+    workers are sent the position without the game history behind it.
+
+    Call close() when done to stop the pool and free the shared memory.
+    """
+    def __init__(self, max_depth, eval_fn, num_workers=None, table_size=1 << 20,
+                 opening_book=None, time_limit=None):
+        AlphaBetaAgent.__init__(self, max_depth, eval_fn, opening_book=opening_book,
+                                time_limit=time_limit, aspiration=None)
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.table_size = table_size
+        self.table = None
+        self.pool = None
+
+    def start(self, num_cols):
+        self.table = TranspositionTable(self.table_size, num_cols)
+        self.pool = multiprocessing.Pool(
+            self.num_workers,
+            initializer=_init_worker,
+            initargs=(self.table.name, self.table_size, num_cols, self.eval_fn))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        if self.table is not None:
+            self.table.close()
+            self.table = None
+
+    def select_move(self, game_state):
+        if self.opening_book is not None:
+            book_move = self.opening_book.select_move(game_state)
+            if book_move is not None:
+                return book_move
+
+        num_cols = game_state.board.num_cols
+        if self.table is None or self.table.num_cols != num_cols:
+            self.close()
+            self.start(num_cols)
+
+        # perf_counter is system-wide on Linux, so the workers can check the
+        # deadline against their own clock
+        start = time.perf_counter()
+        position = game_state.detached()
+        moves = MoveOrdering(table=self.table).order(game_state, 0)
+        nodes = 0
+        best_move = None
+        deadline = None
+        depth = 0
+        while self.max_depth is None or depth <= self.max_depth:
+            self.table.root_score = MIN - 2
+            # the first move sets the bound for the rest
+            depth_best_move, best_score, move_nodes = self.pool.apply(
+                _search_root_move, ((position, moves[0], depth, deadline),))
+            nodes += move_nodes
+            if best_score is None:
+                break
+            scores = {depth_best_move: best_score}
+            self.table.root_score = best_score
+
+            tasks = [(position, move, depth, deadline) for move in moves[1:]]
+            timed_out = False
+            for move, score, move_nodes in self.pool.imap_unordered(_search_root_move, tasks):
+                nodes += move_nodes
+                if score is None:
+                    timed_out = True
+                    continue
+                scores[move] = score
+                if score > best_score:
+                    best_score = score
+                    depth_best_move = move
+                    self.table.root_score = best_score
+            if timed_out:
+                break
+
+            best_move = depth_best_move
+            self.depth_reached = depth
+            # the next iteration starts with the best moves of this one
+            moves = sorted(moves, key=lambda move: scores[move], reverse=True)
+            if self.time_limit is not None:
+                deadline = start + self.time_limit
+            depth += 1
+        self.nodes = nodes
+        return best_move
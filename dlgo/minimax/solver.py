@@ -0,0 +1,149 @@
+import os
+
+import numpy as np
+
+from dlgo.goboard import Move
+from dlgo.gotypes import Player
+from dlgo.minimax.minimax import GameResult
+from dlgo.minimax.transposition import WHITE_TO_MOVE
+from dlgo.openingbook import canonical_hash
+
+__all__ = [
+    'ProofNumberSolver',
+]
+
+INFINITY = float('inf')
+
+# mixed into the key when the last move was a pass, since another pass
+# ends the game
+AFTER_PASS = 0x2545f4914f6cdd1d
+
+
+class PNSNode(object):
+    __slots__ = ['game_state', 'key', 'parent', 'move', 'is_or', 'proof', 'disproof', 'children']
+
+    def __init__(self, game_state, key, parent, move, is_or):
+        self.game_state = game_state
+        self.key = key
+        self.parent = parent
+        self.move = move
+        # OR nodes have the solving player to move
+        self.is_or = is_or
+        self.proof = 1
+        self.disproof = 1
+        self.children = None
+
+
+class ProofNumberSolver(object):
+    """Exact solver for tiny boards (3x3 to 5x5) using proof-number search.
+
+    Solved positions go into a cache keyed by the symmetry-canonical
+    Zobrist hash, the player to move and whether the last move was a pass,
+    so each position and its 8 symmetric versions are solved once, and
+    symmetric moves are only expanded once. The cache ignores the rest of
+    the game history (the ko and superko state), which is the usual
+    trade-off for small-board solvers.
+
+    With cache_path set, the cache is loaded from that file if it exists
+    and save() writes it back.
+    """
+    def __init__(self, cache_path=None, max_nodes=200000):
+        self.cache_path = cache_path
+        self.max_nodes = max_nodes
+        # key -> True if the player to move wins
+        self.cache = {}
+        if cache_path is not None and os.path.exists(cache_path):
+            data = np.load(cache_path)
+            self.cache = dict(zip(data['keys'].tolist(), data['wins'].tolist()))
+
+    def save(self):
+        keys = np.fromiter(self.cache.keys(), dtype=np.uint64, count=len(self.cache))
+        wins = np.fromiter(self.cache.values(), dtype=np.bool_, count=len(self.cache))
+        np.savez(self.cache_path, keys=keys, wins=wins)
+
+    @staticmethod
+    def key(game_state):
+        key, _ = canonical_hash(game_state.board)
+        if game_state.next_player == Player.white:
+            key ^= WHITE_TO_MOVE
+        if game_state.last_move is not None and game_state.last_move.is_pass:
+            key ^= AFTER_PASS
+        return key
+
+    def solve(self, game_state):
+        """Return GameResult.win or GameResult.loss for the player to move,
+        or None if the position was not solved within max_nodes.
+        """
+        board = game_state.board
+        if board.num_rows != board.num_cols:
+            raise ValueError('ProofNumberSolver needs a square board')
+        player = game_state.next_player
+        root = PNSNode(game_state, self.key(game_state), None, None, True)
+        self.evaluate(root, player)
+        num_nodes = 1
+        while root.proof != 0 and root.disproof != 0 and num_nodes < self.max_nodes:
+            node = self.most_proving(root)
+            num_nodes += self.expand(node, player)
+            self.update_ancestors(node)
+        if root.proof == 0:
+            return GameResult.win
+        if root.disproof == 0:
+            return GameResult.loss
+        return None
+
+    def evaluate(self, node, player):
+        """Set the proof numbers of a new node from the game result or
+        the cache, if either is known."""
+        game_state = node.game_state
+        if game_state.is_over():
+            won = game_state.winner() == player
+        elif node.key in self.cache:
+            # the cache holds the result for the player to move there
+            won = self.cache[node.key] == (game_state.next_player == player)
+        else:
+            return
+        node.proof, node.disproof = (0, INFINITY) if won else (INFINITY, 0)
+
+    @staticmethod
+    def most_proving(node):
+        while node.children is not None:
+            if node.is_or:
+                node = min(node.children, key=lambda child: child.proof)
+            else:
+                node = min(node.children, key=lambda child: child.disproof)
+        return node
+
+    def expand(self, node, player):
+        node.children = []
+        seen = set()
+        for move in node.game_state.legal_moves():
+            # resigning never helps
+            if move.is_resign:
+                continue
+            next_game_state = node.game_state.apply_move(move)
+            key = self.key(next_game_state)
+            # symmetric moves lead to the same position
+            if key in seen:
+                continue
+            seen.add(key)
+            child = PNSNode(next_game_state, key, node, move, not node.is_or)
+            self.evaluate(child, player)
+            node.children.append(child)
+        return len(node.children)
+
+    def update_ancestors(self, node):
+        while node is not None:
+            if node.is_or:
+                proof = min(child.proof for child in node.children)
+                disproof = sum(child.disproof for child in node.children)
+            else:
+                proof = sum(child.proof for child in node.children)
+                disproof = min(child.disproof for child in node.children)
+            node.proof = proof
+            node.disproof = disproof
+            if proof == 0 or disproof == 0:
+                # the solving player wins here iff proof is 0
+                self.cache[node.key] = (proof == 0) == node.is_or
+                # the subtree is no longer needed
+                node.children = []
+            node = node.parent
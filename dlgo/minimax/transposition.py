@@ -0,0 +1,124 @@
+import struct
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from dlgo.goboard import Move
+from dlgo.gotypes import Player, Point
+
+__all__ = [
+    'TranspositionTable',
+]
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+NO_MOVE = 0xFFFF
+PASS = 0xFFFE
+RESIGN = 0xFFFD
+
+# mixed into the key when white is to move
+WHITE_TO_MOVE = 0x5bd1e9955bd1e995
+
+TableEntry = namedtuple('TableEntry', 'depth flag score move')
+
+
+def float_bits(value):
+    return struct.unpack('<Q', struct.pack('<d', value))[0]
+
+
+def bits_float(bits):
+    return struct.unpack('<d', struct.pack('<Q', bits))[0]
+
+
+class TranspositionTable:
+    """Search results keyed by position, in a block of shared memory that
+    several processes can read and write without locks.
+
+    Each slot holds three 64-bit words: the score, the packed depth, bound
+    flag and best move, and the key XORed with both. A slot torn by two
+    concurrent writes fails the check on read and is treated as empty.
+    The header holds one shared float, the best root score found so far.
+
+    Create the table with name=None and attach to it from other processes
+    by name.
+    """
+    def __init__(self, num_entries, num_cols, name=None):
+        self.num_entries = num_entries
+        self.num_cols = num_cols
+        size = 8 + num_entries * 24
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.header = np.ndarray((1,), dtype=np.float64, buffer=self.shm.buf)
+        self.entries = np.ndarray((num_entries, 3), dtype=np.uint64, buffer=self.shm.buf, offset=8)
+        if self.owner:
+            self.clear()
+
+    def clear(self):
+        self.entries[:] = 0
+        self.header[0] = 0.0
+
+    @staticmethod
+    def key(game_state):
+        key = game_state.board.zobrist_hash()
+        if game_state.next_player == Player.white:
+            key ^= WHITE_TO_MOVE
+        return key
+
+    def probe(self, game_state):
+        key = self.key(game_state)
+        check, score_bits, data = (int(word) for word in self.entries[key % self.num_entries])
+        if check ^ score_bits ^ data != key:
+            return None
+        return TableEntry(
+            depth=data >> 24,
+            flag=(data >> 16) & 0xFF,
+            score=bits_float(score_bits),
+            move=self.decode_move(data & 0xFFFF),
+        )
+
+    def store(self, game_state, depth, flag, score, move):
+        key = self.key(game_state)
+        score_bits = float_bits(score)
+        data = (depth << 24) | (flag << 16) | self.encode_move(move)
+        self.entries[key % self.num_entries] = (key ^ score_bits ^ data, score_bits, data)
+
+    @property
+    def root_score(self):
+        return float(self.header[0])
+
+    @root_score.setter
+    def root_score(self, score):
+        self.header[0] = score
+
+    def encode_move(self, move):
+        if move is None:
+            return NO_MOVE
+        if move.is_pass:
+            return PASS
+        if move.is_resign:
+            return RESIGN
+        return (move.point.row - 1) * self.num_cols + (move.point.col - 1)
+
+    def decode_move(self, code):
+        if code == NO_MOVE:
+            return None
+        if code == PASS:
+            return Move.pass_turn()
+        if code == RESIGN:
+            return Move.resign()
+        return Move.play(Point(row=code // self.num_cols + 1, col=code % self.num_cols + 1))
+
+    def close(self):
+        # drop the numpy views before the buffer goes away
+        self.header = None
+        self.entries = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
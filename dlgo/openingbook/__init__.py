@@ -0,0 +1 @@
+from dlgo.openingbook.openingbook import *
\ No newline at end of file
@@ -0,0 +1,195 @@
+from dlgo.dataprocessor.dataprocessor import DataProcessor, transformations
+from dlgo.goboard import Move
+from dlgo.gosgf import Sgf_game
+from dlgo.gotypes import Player, Point
+from dlgo.zobrist import HASH_CODE
+import numpy as np
+import tarfile
+
+
+__all__ = [
+    'OpeningBook',
+    'canonical_hash',
+]
+
+# inverse of each transformation in dataprocessor.transformations
+INVERSE = {
+    'identity': 'identity',
+    'rotate_90': 'rotate_270',
+    'rotate_180': 'rotate_180',
+    'rotate_270': 'rotate_90',
+    'flip_horizontal': 'flip_horizontal',
+    'flip_vertical': 'flip_vertical',
+    'flip_diagonal': 'flip_diagonal',
+    'flip_antidiagonal': 'flip_antidiagonal',
+}
+
+PLAYER_CODE = {Player.black: 1, Player.white: 2}
+
+ENTRY_DTYPE = np.dtype([
+    ('hash', np.uint64),
+    ('player', np.int8),
+    ('move', np.int16),
+    ('count', np.int32),
+    ('wins', np.int32),
+])
+
+
+def canonical_hash(board):
+    """Return the smallest Zobrist hash over the 8 symmetries of board and
+    the list of transformations that produce it. There is more than one
+    when the position itself is symmetric.
+    """
+    stones = [(point, string.color) for point, string in board._grid.items()
+              if string is not None]
+    size = board.num_rows
+    best_hash = None
+    best_transformations = []
+    for transformation in transformations:
+        h = 0
+        for point, color in stones:
+            h ^= HASH_CODE[DataProcessor.transform_point(point, transformation, size), color]
+        if best_hash is None or h < best_hash:
+            best_hash = h
+            best_transformations = [transformation]
+        elif h == best_hash:
+            best_transformations.append(transformation)
+    return best_hash, best_transformations
+
+
+class OpeningBook:
+    """Move frequencies and win rates for opening positions of KGS games.
+
+    Positions are keyed by the canonical Zobrist hash of the board and the
+    player to move, so the 8 symmetric versions of a position share one
+    entry, and moves are kept in the canonical orientation. The book is
+    stored as a sorted numpy array and looked up by binary search.
+
+    select_move only plays moves seen at least min_count times.
+    """
+    def __init__(self, board_size=19, entries=None, min_count=10):
+        self.board_size = board_size
+        self.min_count = min_count
+        if entries is None:
+            entries = np.zeros(0, dtype=ENTRY_DTYPE)
+        self.entries = entries
+        # (hash, player, move) -> [count, wins] while the book is built
+        self.pending = {}
+
+    def add_game(self, sgf, max_moves=30):
+        """Add the first max_moves moves of a parsed Sgf_game. Games on
+        other board sizes are skipped, and a pass ends the opening.
+        """
+        if sgf.get_size() != self.board_size:
+            return
+        winner = sgf.get_winner()
+        game_state, first_move_done = DataProcessor.get_handicap(sgf)
+        num_moves = 0
+        for item in sgf.main_sequence_iter():
+            color, move_tuple = item.get_move()
+            if color is None:
+                continue
+            if move_tuple is None or num_moves >= max_moves:
+                break
+            row, col = move_tuple
+            point = Point(row + 1, col + 1)
+            key_hash, symmetries = canonical_hash(game_state.board)
+            # moves that are equivalent on a symmetric board share an entry
+            canonical_move = min(
+                self.encode_point(DataProcessor.transform_point(point, transformation, self.board_size))
+                for transformation in symmetries)
+            key = (key_hash, PLAYER_CODE[game_state.next_player], canonical_move)
+            stats = self.pending.setdefault(key, [0, 0])
+            stats[0] += 1
+            if winner == color:
+                stats[1] += 1
+            game_state = game_state.apply_move(Move.play(point))
+            num_moves += 1
+
+    def add_sgf_files(self, zip_file_name=None, file_list=None, max_moves=30):
+        """Add every game of a KGS .tar archive or a list of .sgf files,
+        as read by DataProcessor.
+        """
+        zip_file = None
+        if zip_file_name is not None:
+            zip_file = tarfile.open(zip_file_name)
+            file_list = zip_file.getnames()
+        for name in file_list:
+            if not name.endswith('.sgf'):
+                continue
+            if zip_file:
+                with zip_file.extractfile(name) as file:
+                    sgf_content = file.read()
+            else:
+                with open(name, 'r') as file:
+                    sgf_content = file.read()
+            self.add_game(Sgf_game.from_string(sgf_content), max_moves)
+
+    def finish(self, min_count=1):
+        """Merge the games added so far into the sorted entries, keeping
+        moves played at least min_count times.
+        """
+        stats = {}
+        for entry in self.entries:
+            key = (int(entry['hash']), int(entry['player']), int(entry['move']))
+            stats[key] = [int(entry['count']), int(entry['wins'])]
+        for key, (count, wins) in self.pending.items():
+            merged = stats.setdefault(key, [0, 0])
+            merged[0] += count
+            merged[1] += wins
+        self.pending = {}
+        records = [key + (count, wins) for key, (count, wins) in stats.items()
+                   if count >= min_count]
+        entries = np.array(records, dtype=ENTRY_DTYPE)
+        self.entries = np.sort(entries, order=['hash', 'player', 'move'])
+
+    def save(self, path):
+        if self.pending:
+            self.finish()
+        np.savez(path, entries=self.entries, board_size=self.board_size)
+
+    @classmethod
+    def load(cls, path, min_count=10):
+        data = np.load(path)
+        return cls(int(data['board_size']), data['entries'], min_count)
+
+    def lookup(self, game_state):
+        """Return (move, count, win rate) for each book move in game_state,
+        most played first. The win rate is for the player to move.
+        """
+        board = game_state.board
+        if board.num_rows != self.board_size or board.num_cols != self.board_size:
+            return []
+        key_hash, symmetries = canonical_hash(board)
+        hashes = self.entries['hash']
+        start = np.searchsorted(hashes, np.uint64(key_hash), side='left')
+        end = np.searchsorted(hashes, np.uint64(key_hash), side='right')
+        player = PLAYER_CODE[game_state.next_player]
+        inverse = INVERSE[symmetries[0]]
+        moves = []
+        for entry in self.entries[start:end]:
+            if entry['player'] != player:
+                continue
+            point = self.decode_point(int(entry['move']))
+            point = DataProcessor.transform_point(point, inverse, self.board_size)
+            count = int(entry['count'])
+            moves.append((Move.play(point), count, float(entry['wins']) / count))
+        moves.sort(key=lambda m: (m[1], m[2]), reverse=True)
+        return moves
+
+    def select_move(self, game_state):
+        """Return the most played legal book move for game_state if it was
+        played at least min_count times, otherwise None.
+        """
+        for move, count, win_rate in self.lookup(game_state):
+            if count < self.min_count:
+                break
+            if game_state.is_valid_move(move):
+                return move
+        return None
+
+    def encode_point(self, point):
+        return (point.row - 1) * self.board_size + (point.col - 1)
+
+    def decode_point(self, index):
+        return Point(row=index // self.board_size + 1, col=index % self.board_size + 1)
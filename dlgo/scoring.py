@@ -82,7 +82,7 @@ def evaluate_territory(board):
                 if len(neighbors) == 1:
                     neighbor_stone = neighbors.pop()
                     stone_str = 'b' if neighbor_stone == Player.black else 'w'
-                    fill_with = 'terrtory_' + stone_str
+                    fill_with = 'territory_' + stone_str
                 else:
                     fill_with = 'dame'
                 for pos in group:
@@ -0,0 +1 @@
+from dlgo.selfplay.selfplay import *
@@ -0,0 +1,198 @@
+import json
+import multiprocessing
+import os
+import random
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from dlgo.goboard import GameState
+from dlgo.gotypes import Player
+from dlgo.scoring import compute_game_result
+from dlgo.utils import point_to_sgf_coords
+
+
+__all__ = [
+    'GameRecord',
+    'SelfPlay',
+    'game_to_sgf',
+    'play_game',
+]
+
+GameRecord = namedtuple('GameRecord', 'game_index black white result winner num_moves seconds sgf')
+
+
+def agent_name(factory):
+    # functools.partial has no name of its own
+    factory = getattr(factory, 'func', factory)
+    return getattr(factory, '__name__', None) or type(factory).__name__
+
+
+def play_game(black_agent, white_agent, board_size=9, max_moves=None):
+    """Play one game without any output. Returns the final GameState, the
+    moves played and the result string, e.g. 'B+3.5' or 'W+R'.
+
+    A game that reaches max_moves is scored as it stands.
+    """
+    agents = {
+        Player.black: black_agent,
+        Player.white: white_agent,
+    }
+    game = GameState.new_game(board_size)
+    moves = []
+    while not game.is_over():
+        if max_moves is not None and len(moves) >= max_moves:
+            break
+        move = agents[game.next_player].select_move(game)
+        moves.append(move)
+        game = game.apply_move(move)
+    if game.last_move is not None and game.last_move.is_resign:
+        # the player to move is the one who did not resign
+        result = '%s+R' % ('B' if game.next_player == Player.black else 'W')
+    else:
+        result = str(compute_game_result(game))
+    return game, moves, result
+
+
+def game_to_sgf(board_size, moves, result, komi=7.5):
+    """SGF text of a game that starts on an empty board with black."""
+    header = '(;GM[1]FF[4]SZ[%d]KM[%s]RE[%s]' % (board_size, komi, result)
+    nodes = []
+    player = Player.black
+    for move in moves:
+        color = 'B' if player == Player.black else 'W'
+        if move.is_play:
+            nodes.append(';%s[%s]' % (color, point_to_sgf_coords(move.point)))
+        elif move.is_pass:
+            nodes.append(';%s[]' % color)
+        player = player.other
+    return header + '\n' + '\n'.join(nodes) + ')\n'
+
+
+# per-process state of the pool workers
+_worker = {}
+
+
+def _init_worker(black_factory, white_factory, board_size, max_moves):
+    _worker['factories'] = (black_factory, white_factory)
+    _worker['board_size'] = board_size
+    _worker['max_moves'] = max_moves
+    seed_random()
+
+
+def seed_random(seed=None):
+    """Seed random and numpy. Forked workers start with the parent's
+    random state, so without a seed they would all play the same games;
+    seed=None seeds from os.urandom instead.
+    """
+    if seed is None:
+        random.seed(os.urandom(16))
+        np.random.seed(int.from_bytes(os.urandom(4), 'little'))
+    else:
+        random.seed(seed)
+        np.random.seed(seed % 2 ** 32)
+
+
+def _play_one(args):
+    game_index, seed, swap = args
+    if seed is not None:
+        seed_random(seed + game_index)
+    black_factory, white_factory = _worker['factories']
+    if swap:
+        black_factory, white_factory = white_factory, black_factory
+    black_agent = black_factory()
+    white_agent = white_factory()
+    start = time.time()
+    try:
+        game, moves, result = play_game(
+            black_agent, white_agent, _worker['board_size'], _worker['max_moves'])
+    finally:
+        for agent in (black_agent, white_agent):
+            if hasattr(agent, 'close'):
+                agent.close()
+    return game_index, swap, moves, result, time.time() - start
+
+
+class SelfPlay:
+    """Plays games between the agents that two factories create, on a
+    process pool and without any screen output.
+
+    The factories are called in the worker processes, once per game, so
+    they have to be picklable: module-level functions or functools.partial
+    of a class work, lambdas do not. With alternate_colors, every second
+    game swaps the factories, so each one plays black half the time.
+
+    With seed set, game i is played after seeding random and numpy with
+    seed + i, so a run can be reproduced whatever the number of workers.
+    Without it, each worker is seeded from os.urandom.
+
+    Each finished game is written as it comes in: an SGF file in sgf_dir
+    and a JSON line in results_path, if they are set.
+    """
+    def __init__(self, black_factory, white_factory, board_size=9, num_workers=None,
+                 max_moves=None, seed=None, alternate_colors=False,
+                 sgf_dir=None, results_path=None):
+        self.black_factory = black_factory
+        self.white_factory = white_factory
+        self.board_size = board_size
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.max_moves = max_moves
+        self.seed = seed
+        self.alternate_colors = alternate_colors
+        self.sgf_dir = sgf_dir
+        self.results_path = results_path
+        self.games_per_sec = None
+
+    def run(self, num_games, callback=None):
+        """Play num_games games and return their GameRecords in the order
+        they finished. callback, if given, is called with each record.
+        """
+        if self.sgf_dir is not None:
+            os.makedirs(self.sgf_dir, exist_ok=True)
+        names = (agent_name(self.black_factory), agent_name(self.white_factory))
+        tasks = [(i, self.seed, self.alternate_colors and i % 2 == 1)
+                 for i in range(num_games)]
+        records = []
+        start = time.time()
+        pool = multiprocessing.Pool(
+            self.num_workers,
+            initializer=_init_worker,
+            initargs=(self.black_factory, self.white_factory, self.board_size, self.max_moves))
+        try:
+            for game_index, swap, moves, result, seconds in pool.imap_unordered(_play_one, tasks):
+                black, white = names[::-1] if swap else names
+                record = GameRecord(
+                    game_index=game_index,
+                    black=black,
+                    white=white,
+                    result=result,
+                    winner=result[0] if result[0] in 'BW' else None,
+                    num_moves=len(moves),
+                    seconds=seconds,
+                    sgf=self.write_sgf(game_index, moves, result),
+                )
+                self.write_result(record)
+                records.append(record)
+                if callback is not None:
+                    callback(record)
+        finally:
+            pool.terminate()
+            pool.join()
+        elapsed = time.time() - start
+        self.games_per_sec = num_games / elapsed if elapsed > 0 else 0.0
+        return records
+
+    def write_sgf(self, game_index, moves, result):
+        if self.sgf_dir is None:
+            return None
+        path = os.path.join(self.sgf_dir, 'game_%06d.sgf' % game_index)
+        with open(path, 'w') as f:
+            f.write(game_to_sgf(self.board_size, moves, result))
+        return path
+
+    def write_result(self, record):
+        if self.results_path is None:
+            return
+        with open(self.results_path, 'a') as f:
+            f.write(json.dumps(record._asdict()) + '\n')
@@ -0,0 +1,262 @@
+from dlgo.gotypes import Point
+
+__all__ = [
+    'TacticalReader',
+]
+
+EMPTY = 0
+BORDER = 3
+
+
+class TacticalReader(object):
+    """Local capture search around a single string, such as ladders.
+
+    Only moves on the target's liberties, plus captures of the attacking
+    strings next to the target that are in atari, are read. A string that
+    reaches max_liberties + 1 liberties counts as escaped. Within the
+    search a single stone cannot be retaken at once (simple ko), which
+    keeps capture and recapture from going round in circles; ko fights are
+    not read further. Each query reads at most max_nodes positions; when
+    it runs out, the result is None.
+
+    The search runs on the reader's own flat copy of the board, with a one
+    point border, and plays and takes back moves in place, so a node costs
+    a few list operations rather than a board copy. The copy is made once
+    per board and reused while queries keep asking about the same one.
+    """
+    def __init__(self, max_nodes=200, max_liberties=2):
+        self.max_nodes = max_nodes
+        self.max_liberties = max_liberties
+        self.nodes = 0
+        self.dim = None
+        self.source = None
+        self.source_hash = None
+        # (point played, points captured, ko point before the move) of the
+        # moves on the board, and the point that cannot be played now
+        self.played = []
+        self.ko = None
+
+    def can_capture(self, board, point):
+        """Can the opponent of the string at point, moving first, capture
+        it? Returns True, False or None if the search gave up.
+        """
+        p = self.load(board, point)
+        return self.run(self.attack, p)
+
+    def can_escape(self, board, point):
+        """Can the owner of the string at point, moving first, save it from
+        capture? Returns True, False or None if the search gave up.
+        """
+        p = self.load(board, point)
+        return self.run(self.defend, p)
+
+    def ladder_captures(self, board, point):
+        """The liberties of the string at point that capture it when its
+        opponent plays there: afterwards the string cannot escape. Only
+        moves the search proves within max_nodes are returned.
+        """
+        p = self.load(board, point)
+        color = self.board[p]
+        moves = []
+        for lib in sorted(self.string(p)[1]):
+            if self.play(lib, 3 - color):
+                if self.run(self.defend, p) is False:
+                    moves.append(self.point_at(lib))
+                self.undo()
+        return moves
+
+    def ladder_escapes(self, board, point):
+        """The moves that save the string at point when its owner plays
+        there: afterwards it is not in atari and cannot be captured. Only
+        moves the search proves within max_nodes are returned.
+        """
+        p = self.load(board, point)
+        color = self.board[p]
+        stones, libs = self.string(p)
+        moves = []
+        for move in self.defending_moves(stones, libs, color):
+            if self.play(move, color):
+                if len(self.string(p)[1]) > 1 and self.run(self.attack, p) is False:
+                    moves.append(self.point_at(move))
+                self.undo()
+        return moves
+
+    def load(self, board, point):
+        """Copy board into the flat board unless it is the one already
+        there, and return the index of point."""
+        if self.dim != (board.num_rows, board.num_cols):
+            self.dim = (board.num_rows, board.num_cols)
+            self.stride = board.num_cols + 2
+            self.orth = (-self.stride, self.stride, -1, 1)
+            self.source = None
+        if board is not self.source or board.zobrist_hash() != self.source_hash:
+            s = self.stride
+            flat = [BORDER] * ((board.num_rows + 2) * s)
+            for r, row in enumerate(board.stone_array().tolist(), 1):
+                flat[r * s + 1:r * s + 1 + board.num_cols] = row
+            self.board = flat
+            self.source = board
+            self.source_hash = board.zobrist_hash()
+        self.ko = None
+        p = point.row * self.stride + point.col
+        if self.board[p] == EMPTY:
+            raise ValueError('no string at %s' % (point,))
+        return p
+
+    def point_at(self, p):
+        return Point(row=p // self.stride, col=p % self.stride)
+
+    def run(self, search, p):
+        self.nodes = 0
+        depth = len(self.played)
+        try:
+            return search(p)
+        except _NodeLimit:
+            while len(self.played) > depth:
+                self.undo()
+            return None
+
+    def visit(self):
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise _NodeLimit()
+
+    def attack(self, p):
+        """Attacker to move: True if the string at p can be captured."""
+        self.visit()
+        color = self.board[p]
+        if color == EMPTY:
+            return True
+        libs = self.string(p)[1]
+        if len(libs) == 1:
+            return True
+        if len(libs) > self.max_liberties:
+            return False
+        for lib in sorted(libs):
+            if not self.play(lib, 3 - color):
+                continue
+            escaped = self.defend(p)
+            self.undo()
+            if not escaped:
+                return True
+        return False
+
+    def defend(self, p):
+        """Defender to move: True if the string at p can be saved."""
+        self.visit()
+        color = self.board[p]
+        if color == EMPTY:
+            return False
+        stones, libs = self.string(p)
+        if len(libs) > self.max_liberties:
+            return True
+        for move in self.defending_moves(stones, libs, color):
+            if not self.play(move, color):
+                continue
+            if len(self.string(p)[1]) == 1:
+                # self atari, the attacker captures at once
+                self.undo()
+                continue
+            captured = self.attack(p)
+            self.undo()
+            if not captured:
+                return True
+        return False
+
+    def defending_moves(self, stones, libs, color):
+        # captures of adjacent attacking strings in atari come first, then
+        # extensions on the string's own liberties
+        board = self.board
+        moves = []
+        checked = set()
+        for q in stones:
+            for d in self.orth:
+                n = q + d
+                if n in checked or board[n] != 3 - color:
+                    continue
+                enemy_stones, enemy_libs = self.string(n)
+                checked.update(enemy_stones)
+                if len(enemy_libs) == 1:
+                    lib = next(iter(enemy_libs))
+                    if lib not in moves:
+                        moves.append(lib)
+        moves.extend(lib for lib in sorted(libs) if lib not in moves)
+        return moves
+
+    def string(self, p):
+        """Stones and liberties of the string at p."""
+        board = self.board
+        color = board[p]
+        stones = [p]
+        seen = {p}
+        libs = set()
+        i = 0
+        while i < len(stones):
+            q = stones[i]
+            i += 1
+            for d in self.orth:
+                n = q + d
+                v = board[n]
+                if v == EMPTY:
+                    libs.add(n)
+                elif v == color and n not in seen:
+                    seen.add(n)
+                    stones.append(n)
+        return stones, libs
+
+    def has_liberty(self, p):
+        """Whether the string at p has a liberty; stops at the first one."""
+        board = self.board
+        color = board[p]
+        stack = [p]
+        seen = {p}
+        while stack:
+            q = stack.pop()
+            for d in self.orth:
+                n = q + d
+                v = board[n]
+                if v == EMPTY:
+                    return True
+                if v == color and n not in seen:
+                    seen.add(n)
+                    stack.append(n)
+        return False
+
+    def play(self, p, color):
+        """Play color at p and return True, or leave the board as it was
+        and return False if the move is suicide or retakes a ko."""
+        if p == self.ko:
+            return False
+        board = self.board
+        board[p] = color
+        captured = []
+        for d in self.orth:
+            n = p + d
+            if board[n] == 3 - color and not self.has_liberty(n):
+                stones = self.string(n)[0]
+                for q in stones:
+                    board[q] = EMPTY
+                captured.extend(stones)
+        if not captured and not self.has_liberty(p):
+            board[p] = EMPTY
+            return False
+        self.played.append((p, captured, self.ko))
+        self.ko = None
+        if len(captured) == 1:
+            # a lone stone with one liberty that took one stone is a ko
+            neighbors = [board[p + d] for d in self.orth]
+            if color not in neighbors and neighbors.count(EMPTY) == 1:
+                self.ko = captured[0]
+        return True
+
+    def undo(self):
+        p, captured, self.ko = self.played.pop()
+        board = self.board
+        opponent = 3 - board[p]
+        board[p] = EMPTY
+        for q in captured:
+            board[q] = opponent
+
+
+class _NodeLimit(Exception):
+    pass
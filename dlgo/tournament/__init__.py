@@ -0,0 +1 @@
+from dlgo.tournament.tournament import *
@@ -0,0 +1,281 @@
+import itertools
+import json
+import math
+import multiprocessing
+import queue
+import time
+from collections import namedtuple
+
+from dlgo.selfplay.selfplay import agent_name, play_game, seed_random
+
+
+__all__ = [
+    'SPRT',
+    'Tournament',
+    'bayes_elo',
+    'elo_from_score',
+    'elo_interval',
+]
+
+MatchResult = namedtuple('MatchResult', 'black white result winner num_moves seconds')
+
+
+def elo_from_score(score):
+    """Elo difference that gives an expected score in (0, 1)."""
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400.0 * math.log10(1.0 / score - 1.0)
+
+
+def elo_interval(wins, losses, z=1.96):
+    """Elo difference of a match and the bounds of its confidence interval,
+    from the normal approximation of the score. The width uses the
+    Agresti-Coull adjusted score, so a match won or lost outright still
+    gets an interval."""
+    games = wins + losses
+    if games == 0:
+        return 0.0, -math.inf, math.inf
+    score = wins / games
+    adjusted = (wins + z * z / 2) / (games + z * z)
+    margin = z * math.sqrt(adjusted * (1 - adjusted) / (games + z * z))
+    return (elo_from_score(score),
+            elo_from_score(score - margin) if score - margin > 0 else -math.inf,
+            elo_from_score(score + margin) if score + margin < 1 else math.inf)
+
+
+def bayes_elo(wins, prior=2.0, iterations=1000, tolerance=1e-9):
+    """Ratings of all players from the win counts of every pair, as a
+    Bradley-Terry maximum a posteriori estimate in the style of BayesElo.
+
+    wins maps (a, b) to the number of games a won against b. Each pair
+    that played is given prior virtual games split evenly, which keeps
+    players that won or lost every game at a finite rating. The ratings
+    average 0.
+    """
+    players = sorted(set(itertools.chain.from_iterable(wins)))
+    won = {player: 0.0 for player in players}
+    games = {}
+    for (a, b), count in wins.items():
+        won[a] += count
+        games[a, b] = games.get((a, b), 0.0) + count
+        games[b, a] = games.get((b, a), 0.0) + count
+    for a, b in games:
+        won[a] += prior / 2
+    games = {pair: count + prior for pair, count in games.items()}
+    gamma = {player: 1.0 for player in players}
+    for _ in range(iterations):
+        new_gamma = {}
+        for a in players:
+            denominator = sum(
+                games[a, b] / (gamma[a] + gamma[b])
+                for b in players if (a, b) in games)
+            new_gamma[a] = won[a] / denominator if denominator > 0 else gamma[a]
+        # keep the geometric mean at 1
+        log_mean = sum(math.log(g) for g in new_gamma.values()) / len(players)
+        new_gamma = {a: g / math.exp(log_mean) for a, g in new_gamma.items()}
+        change = max(abs(new_gamma[a] - gamma[a]) for a in players)
+        gamma = new_gamma
+        if change < tolerance:
+            break
+    return {a: 400.0 * math.log10(gamma[a]) for a in players}
+
+
+class SPRT:
+    """Sequential probability ratio test between two Elo hypotheses,
+    elo0 (H0) and elo1 (H1), on the wins and losses of one match.
+
+    status() is 'H1' once the log-likelihood ratio crosses the upper bound,
+    'H0' once it crosses the lower one, and None until then.
+    """
+    def __init__(self, elo0=0.0, elo1=50.0, alpha=0.05, beta=0.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.p0 = 1.0 / (1.0 + 10 ** (-elo0 / 400.0))
+        self.p1 = 1.0 / (1.0 + 10 ** (-elo1 / 400.0))
+
+    def llr(self, wins, losses):
+        return wins * math.log(self.p1 / self.p0) + \
+            losses * math.log((1 - self.p1) / (1 - self.p0))
+
+    def status(self, wins, losses):
+        llr = self.llr(wins, losses)
+        if llr >= self.upper:
+            return 'H1'
+        if llr <= self.lower:
+            return 'H0'
+        return None
+
+
+# per-process state of the pool workers
+_worker = {}
+
+
+def _init_worker(factories, board_size, max_moves):
+    _worker['factories'] = factories
+    _worker['board_size'] = board_size
+    _worker['max_moves'] = max_moves
+    seed_random()
+
+
+def _play_match_game(args):
+    black, white, seed = args
+    if seed is not None:
+        seed_random(seed)
+    factories = _worker['factories']
+    black_agent = factories[black]()
+    white_agent = factories[white]()
+    start = time.time()
+    try:
+        game, moves, result = play_game(
+            black_agent, white_agent, _worker['board_size'], _worker['max_moves'])
+    finally:
+        for agent in (black_agent, white_agent):
+            if hasattr(agent, 'close'):
+                agent.close()
+    return MatchResult(
+        black=black,
+        white=white,
+        result=result,
+        winner=black if result[0] == 'B' else white,
+        num_moves=len(moves),
+        seconds=time.time() - start,
+    )
+
+
+class Tournament:
+    """Matches between agents on a process pool, with Elo estimates.
+
+    players is a list of agent factories, or a dict from name to factory;
+    as with SelfPlay the factories have to be picklable. In 'round_robin'
+    mode every pair plays a match; in 'gauntlet' mode only the first
+    player plays, against each of the others. Each match is games_per_match
+    games long with the colours alternating.
+
+    With sprt set, to an SPRT instance, a match stops early as soon as the
+    test accepts either hypothesis about the first player of the pair.
+    Games are handed to the pool a few at a time so that stopping a match
+    wastes at most the games already running.
+
+    Each game is appended to results_path as a compact JSON line.
+    """
+    def __init__(self, players, board_size=9, games_per_match=100, mode='round_robin',
+                 sprt=None, num_workers=None, max_moves=None, seed=None, results_path=None):
+        if not isinstance(players, dict):
+            players = {agent_name(factory): factory for factory in players}
+        if mode not in ('round_robin', 'gauntlet'):
+            raise ValueError('unknown tournament mode %r' % (mode,))
+        self.players = players
+        self.board_size = board_size
+        self.games_per_match = games_per_match
+        self.mode = mode
+        self.sprt = sprt
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.max_moves = max_moves
+        self.seed = seed
+        self.results_path = results_path
+        names = list(players)
+        if mode == 'gauntlet':
+            self.matches = [(names[0], other) for other in names[1:]]
+        else:
+            self.matches = list(itertools.combinations(names, 2))
+        # (a, b) -> games a won against b
+        self.wins = {}
+        for a, b in self.matches:
+            self.wins[a, b] = 0
+            self.wins[b, a] = 0
+        self.sprt_status = {}
+        self.games_per_sec = None
+
+    def run(self, callback=None):
+        """Play all matches. callback, if given, is called with each
+        MatchResult as it comes in. Returns the standings, see standings().
+        """
+        scheduled = {match: 0 for match in self.matches}
+        results = queue.Queue()
+        num_games = 0
+        start = time.time()
+        pool = multiprocessing.Pool(
+            self.num_workers,
+            initializer=_init_worker,
+            initargs=(self.players, self.board_size, self.max_moves))
+        try:
+            running = 0
+            while True:
+                while running < 2 * self.num_workers:
+                    match = self.next_match(scheduled)
+                    if match is None:
+                        break
+                    a, b = match
+                    # colours alternate within each match
+                    black, white = (a, b) if scheduled[match] % 2 == 0 else (b, a)
+                    seed = None
+                    if self.seed is not None:
+                        seed = self.seed + self.matches.index(match) * self.games_per_match \
+                            + scheduled[match]
+                    scheduled[match] += 1
+                    pool.apply_async(_play_match_game, ((black, white, seed),),
+                                     callback=results.put, error_callback=results.put)
+                    running += 1
+                if running == 0:
+                    break
+                result = results.get()
+                running -= 1
+                if isinstance(result, BaseException):
+                    raise result
+                match = self.match_of(result)
+                num_games += 1
+                self.record(match, result)
+                if callback is not None:
+                    callback(result)
+        finally:
+            pool.terminate()
+            pool.join()
+        elapsed = time.time() - start
+        self.games_per_sec = num_games / elapsed if elapsed > 0 else 0.0
+        return self.standings()
+
+    def next_match(self, scheduled):
+        # the match with the fewest games so far that still needs games
+        open_matches = [match for match in self.matches
+                        if scheduled[match] < self.games_per_match
+                        and self.sprt_status.get(match) is None]
+        if not open_matches:
+            return None
+        return min(open_matches, key=lambda match: scheduled[match])
+
+    def match_of(self, result):
+        if (result.black, result.white) in self.matches:
+            return result.black, result.white
+        return result.white, result.black
+
+    def record(self, match, result):
+        a, b = match
+        loser = b if result.winner == a else a
+        self.wins[result.winner, loser] += 1
+        if self.sprt is not None and self.sprt_status.get(match) is None:
+            self.sprt_status[match] = self.sprt.status(self.wins[a, b], self.wins[b, a])
+        if self.results_path is not None:
+            with open(self.results_path, 'a') as f:
+                f.write(json.dumps([result.black, result.white, result.result,
+                                    result.num_moves, round(result.seconds, 3)]) + '\n')
+
+    def standings(self):
+        """Return a list of (name, elo, wins, games) sorted by rating, with
+        the ratings from bayes_elo, and a dict from each match to
+        (wins, losses, elo, elo_low, elo_high, sprt_status) for its first
+        player.
+        """
+        ratings = bayes_elo(self.wins)
+        table = []
+        for name in self.players:
+            wins = sum(count for (a, _), count in self.wins.items() if a == name)
+            games = wins + sum(count for (_, b), count in self.wins.items() if b == name)
+            table.append((name, ratings.get(name, 0.0), wins, games))
+        table.sort(key=lambda row: row[1], reverse=True)
+        matches = {}
+        for a, b in self.matches:
+            wins, losses = self.wins[a, b], self.wins[b, a]
+            elo, low, high = elo_interval(wins, losses)
+            matches[a, b] = (wins, losses, elo, low, high, self.sprt_status.get((a, b)))
+        return table, matches
@@ -3,20 +3,37 @@ import torch
 import torch.utils.data as td
 
 __all__ = [
-    'GoDataLoader'
+    'GoDataLoader',
+    'PackedGoDataset',
 ]
 
 class GoDataLoader:
-    def __init__(self, feature_path, label_path = None):
+    """Loads features and labels saved by DataProcessor as a torch Dataset.
+
+    For features saved with DataProcessor(packed=True), pass the encoder's
+    num_planes: the data stays packed in memory and each sample is
+    unpacked to dtype when it is read. Otherwise, if dtype is given, the
+    features are converted to it on load.
+    """
+    def __init__(self, feature_path, label_path = None, num_planes = None, dtype = None):
         self.feature_path = feature_path
         self.label_path = label_path
+        self.num_planes = num_planes
+        self.dtype = dtype
 
     def load_data(self):
         features = np.load(self.feature_path)
+        labels = np.load(self.label_path) if self.label_path else None
+
+        if self.num_planes is not None:
+            dtype = np.float32 if self.dtype is None else self.dtype
+            return PackedGoDataset(features, self.num_planes, labels, dtype=dtype)
+
+        if self.dtype is not None:
+            features = features.astype(self.dtype, copy=False)
         features_tensor = torch.from_numpy(features)
 
-        if self.label_path:
-            labels = np.load(self.label_path)
+        if labels is not None:
             labels_tensor = torch.from_numpy(labels)
             # this dataset can be directly used with torch's DataLoader
             dataset = td.TensorDataset(features_tensor, labels_tensor)
@@ -25,3 +42,30 @@ class GoDataLoader:
         return dataset
 
 
+class PackedGoDataset(td.Dataset):
+    """Dataset over bit-packed features that unpacks on access. Batched
+    reads through torch's DataLoader unpack a whole batch at once."""
+    def __init__(self, packed, num_planes, labels=None, dtype=np.float32):
+        self.packed = packed
+        self.num_planes = num_planes
+        self.labels = labels
+        self.dtype = dtype
+
+    def __len__(self):
+        return len(self.packed)
+
+    def unpack(self, index):
+        features = np.unpackbits(self.packed[index], axis=-3, count=self.num_planes)
+        return torch.from_numpy(features.astype(self.dtype, copy=False))
+
+    def __getitem__(self, index):
+        if self.labels is None:
+            return (self.unpack(index),)
+        return self.unpack(index), torch.as_tensor(self.labels[index])
+
+    def __getitems__(self, indices):
+        features = self.unpack(np.asarray(indices))
+        if self.labels is None:
+            return [(row,) for row in features]
+        labels = torch.from_numpy(self.labels[np.asarray(indices)])
+        return list(zip(features, labels))
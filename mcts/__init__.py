@@ -1 +1,6 @@
-from .mcts import *
\ No newline at end of file
+from .mcts import *
+from .batch_rollout import *
+from .checkpoint import *
+from .pattern_rollout import *
+from .puct import *
+from .report import *
\ No newline at end of file
@@ -0,0 +1,320 @@
+import numpy as np
+
+from dlgo.goboard import Move
+from dlgo.gotypes import Player, Point
+
+__all__ = [
+    'BatchRollout',
+    'simple_ko_point',
+]
+
+# point states in the stacked int8 boards. black and white match Player.value
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+BORDER = 3
+
+
+def simple_ko_point(game_state):
+    """Return the point the player to move may not play because it would
+    retake a ko, or None.
+    """
+    # only the point that recaptures the stone just played can be ko
+    last_move = game_state.last_move
+    if last_move is None or not last_move.is_play:
+        return None
+    go_string = game_state.board.get_go_string(last_move.point)
+    if go_string is None or len(go_string.stones) != 1 or \
+            go_string.num_liberties != 1:
+        return None
+    point = next(iter(go_string.liberties))
+    if game_state.does_move_violate_ko(game_state.next_player, Move.play(point)):
+        return point
+    return None
+
+
+class BatchRollout(object):
+    """Plays many random games in lockstep on stacked numpy boards.
+
+    Boards are flattened with a one point border around them, so every
+    on-board point has four neighbours and four corners inside the array.
+    All boards share the same player to move (a pass is a move too), which
+    lets captures, liberties, legality and eyes be computed for the whole
+    batch with a handful of array operations per ply.
+
+    Moves follow the same policy as FastRandomBot: uniformly random among
+    legal moves that don't fill our own eyes, pass when there are none.
+    Ko is checked for the simple one stone case only.
+
+    A game stops after max_moves moves, or, when margin is set, as soon as
+    the lead in stones and eyes is more than margin larger than what the
+    open points and the capturable stones (strings without two eyes) could
+    overturn.
+    """
+    def __init__(self, num_rows, num_cols, komi=7.5, max_moves=None, margin=None):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.komi = komi
+        if max_moves is None:
+            max_moves = 3 * num_rows * num_cols
+        self.max_moves = max_moves
+        self.margin = margin
+
+        self.stride = num_cols + 2
+        self.size = (num_rows + 2) * self.stride
+        s = self.stride
+        self.template = np.full(self.size, BORDER, dtype=np.int8)
+        points = []
+        self.point_at = {}
+        for r in range(1, num_rows + 1):
+            for c in range(1, num_cols + 1):
+                points.append(self.index(r, c))
+                self.point_at[self.index(r, c)] = Point(row=r, col=c)
+        # flat indices of the on-board points
+        self.points = np.asarray(points)
+        self.template[self.points] = EMPTY
+        # (num_points, 4) indices of the neighbours and corners of each point
+        self.neighbors = self.points[:, None] + np.array([-s, s, -1, 1])
+        self.corners = self.points[:, None] + np.array([-s - 1, -s + 1, s - 1, s + 1])
+
+    def index(self, row, col):
+        return row * self.stride + col
+
+    def simulate(self, game_state, num_games, record_moves=False):
+        """Play num_games random games from game_state and return the list
+        of winners (Player.black, Player.white or None for a draw).
+
+        With record_moves, also return for each game a dict mapping each
+        player to the set of points it played first, for AMAF statistics.
+        """
+        if game_state.is_over():
+            winners = [game_state.winner()] * num_games
+            if record_moves:
+                return winners, [{Player.black: set(), Player.white: set()}
+                                 for _ in range(num_games)]
+            return winners
+
+        board = self.template.copy()
+        for point, go_string in game_state.board._grid.items():
+            if go_string is not None:
+                board[self.index(point.row, point.col)] = go_string.color.value
+        boards = np.tile(board, (num_games, 1))
+
+        passes = 0
+        if game_state.last_move is not None and game_state.last_move.is_pass:
+            passes = 1
+        consecutive_passes = np.full(num_games, passes)
+        ko = np.full(num_games, self._ko_point(game_state))
+
+        # colour that first played on each point during the rollout
+        first_played = np.zeros(boards.shape, dtype=np.int8)
+
+        # games stopped early by the margin, with their winner's value
+        decided = np.zeros(num_games, dtype=np.int8)
+
+        color = game_state.next_player.value
+        num_moves = 0
+        active = consecutive_passes < 2
+        while active.any() and num_moves < self.max_moves:
+            act = np.flatnonzero(active)
+            sub_boards, moves, sub_ko = self._play_one(boards[act], ko[act], color)
+            played = moves >= 0
+            if record_moves:
+                rows = act[played]
+                cols = moves[played]
+                unset = first_played[rows, cols] == 0
+                first_played[rows[unset], cols[unset]] = color
+            boards[act] = sub_boards
+            ko[act] = sub_ko
+            consecutive_passes[act] = np.where(played, 0, consecutive_passes[act] + 1)
+            if self.margin is not None:
+                decided[act] = self._decided(sub_boards)
+            active = (consecutive_passes < 2) & (decided == 0)
+            color = 3 - color
+            num_moves += 1
+
+        winners = self._winners(boards)
+        for i in np.flatnonzero(decided):
+            winners[i] = Player(int(decided[i]))
+        if not record_moves:
+            return winners
+        played_points = []
+        for game in first_played:
+            played_points.append({
+                player: set(self.point_at[i] for i in np.flatnonzero(game == player.value))
+                for player in (Player.black, Player.white)
+            })
+        return winners, played_points
+
+    def _ko_point(self, game_state):
+        point = simple_ko_point(game_state)
+        if point is None:
+            return -1
+        return self.index(point.row, point.col)
+
+    def _label(self, boards, mask):
+        """Label the connected regions of same valued points in mask. Every
+        point in a region gets the smallest flat index of the region.
+        """
+        n = boards.shape[0]
+        labels = np.where(mask, np.arange(self.size), self.size)
+        pts = self.points
+        same = (boards[:, self.neighbors] == boards[:, pts][:, :, None]) & \
+            mask[:, pts][:, :, None]
+        rows = np.arange(n)[:, None]
+        while True:
+            current = labels[:, pts]
+            neighbor_labels = np.where(same, labels[:, self.neighbors], self.size)
+            new = np.minimum(current, neighbor_labels.min(axis=2))
+            # pointer jumping: follow the label to the label of that point
+            in_region = new < self.size
+            new = np.where(in_region, labels[rows, np.where(in_region, new, 0)], new)
+            new = np.minimum(new, current)
+            if np.array_equal(new, current):
+                return labels
+            labels[:, pts] = new
+
+    def _play_one(self, boards, ko, color):
+        n = boards.shape[0]
+        rows = np.arange(n)[:, None]
+        opponent = 3 - color
+        pts = self.points
+
+        stones = (boards == BLACK) | (boards == WHITE)
+        labels = self._label(boards, stones)
+        values = boards[:, self.neighbors]
+        neighbor_labels = labels[:, self.neighbors]
+        empty = boards[:, pts] == EMPTY
+
+        # count each (string, liberty) pair once even if the string touches
+        # the empty point from several sides
+        counted = ((values == BLACK) | (values == WHITE)) & empty[:, :, None]
+        for k in range(1, 4):
+            for j in range(k):
+                counted[:, :, k] &= neighbor_labels[:, :, k] != neighbor_labels[:, :, j]
+        flat = (rows[:, :, None] * self.size + neighbor_labels)[counted]
+        liberties = np.bincount(flat, minlength=n * self.size).reshape(n, self.size)
+        neighbor_liberties = liberties[rows[:, :, None], np.minimum(neighbor_labels, self.size - 1)]
+
+        own = values == color
+        opp = values == opponent
+        captures = opp & (neighbor_liberties == 1)
+        legal = empty & (
+            (values == EMPTY).any(axis=2) |
+            (own & (neighbor_liberties >= 2)).any(axis=2) |
+            captures.any(axis=2))
+        legal &= pts[None, :] != ko[:, None]
+
+        # same rule as is_point_an_eye
+        corner_values = boards[:, self.corners]
+        friendly_corners = (corner_values == color).sum(axis=2)
+        off_board_corners = (corner_values == BORDER).sum(axis=2)
+        eye = (own | (values == BORDER)).all(axis=2) & np.where(
+            off_board_corners > 0,
+            off_board_corners + friendly_corners == 4,
+            friendly_corners >= 3)
+        candidates = legal & ~eye
+
+        scores = np.random.random(candidates.shape)
+        scores[~candidates] = -1.0
+        choice = scores.argmax(axis=1)
+        played = candidates[np.arange(n), choice]
+        # flat index of the stone played on each board, -1 for a pass
+        moves = np.where(played, pts[choice], -1)
+
+        new_ko = np.full(n, -1)
+        idx = np.flatnonzero(played)
+        if len(idx) == 0:
+            return boards, moves, new_ko
+        chosen = choice[idx]
+        boards[idx, pts[chosen]] = color
+
+        # remove opponent strings that just lost their last liberty
+        captured_labels = captures[idx, chosen]
+        captured = np.zeros((n, self.size + 1), dtype=bool)
+        board_idx = np.repeat(idx[:, None], 4, axis=1)[captured_labels]
+        captured[board_idx, neighbor_labels[idx, chosen][captured_labels]] = True
+        removed = captured[rows, labels] & stones
+        boards[removed] = EMPTY
+
+        # a lone stone that captured exactly one stone creates a ko
+        num_removed = removed[idx].sum(axis=1)
+        surrounded = (opp[idx, chosen] | (values[idx, chosen] == BORDER)).all(axis=1)
+        is_ko = (num_removed == 1) & surrounded
+        new_ko[idx[is_ko]] = removed[idx[is_ko]].argmax(axis=1)
+        return boards, moves, new_ko
+
+    def _decided(self, boards):
+        """Colour value of the side whose lead can no longer be overturned,
+        0 where the game is still open.
+        """
+        pts = self.points
+        values = boards[:, self.neighbors]
+        empty = boards[:, pts] == EMPTY
+        lead = (boards == BLACK).sum(axis=1) - (boards == WHITE).sum(axis=1) - self.komi
+        open_points = empty.sum(axis=1)
+        eyes = {}
+        for color, sign in ((BLACK, 1), (WHITE, -1)):
+            eyes[color] = empty & ((values == color) | (values == BORDER)).all(axis=2)
+            num_eyes = eyes[color].sum(axis=1)
+            lead += sign * num_eyes
+            open_points -= num_eyes
+
+        decided = np.zeros(boards.shape[0], dtype=np.int8)
+        # only boards that pass on the open points alone can be decided, so
+        # only those pay for finding the capturable stones
+        close = np.flatnonzero(np.abs(lead) > open_points + self.margin)
+        if len(close) == 0:
+            return decided
+        sub = boards[close]
+        n = len(close)
+        rows = np.arange(n)[:, None]
+        stones = (sub == BLACK) | (sub == WHITE)
+        labels = self._label(sub, stones)
+        neighbor_labels = labels[:, self.neighbors]
+        is_eye = (eyes[BLACK] | eyes[WHITE])[close]
+        # count each (string, eye) pair once, as for liberties
+        counted = ((values[close] == BLACK) | (values[close] == WHITE)) & is_eye[:, :, None]
+        for k in range(1, 4):
+            for j in range(k):
+                counted[:, :, k] &= neighbor_labels[:, :, k] != neighbor_labels[:, :, j]
+        flat = (rows[:, :, None] * self.size + neighbor_labels)[counted]
+        string_eyes = np.bincount(flat, minlength=n * self.size).reshape(n, self.size)
+        settled = (string_eyes[rows, np.minimum(labels, self.size - 1)] >= 2) & stones
+        unsettled = stones.sum(axis=1) - settled.sum(axis=1)
+
+        # a captured stone swings the count by two
+        lead = lead[close]
+        swing = open_points[close] + 2 * unsettled + self.margin
+        decided[close] = np.where(np.abs(lead) > swing, np.where(lead > 0, BLACK, WHITE), 0)
+        return decided
+
+    def _winners(self, boards):
+        """Area scoring: stones plus empty regions bordered by one colour."""
+        n = boards.shape[0]
+        rows = np.arange(n)[:, None]
+        pts = self.points
+        empty = boards == EMPTY
+        labels = self._label(boards, empty)
+        values = boards[:, self.neighbors]
+        region = labels[:, pts]
+        touches = {}
+        for color in (BLACK, WHITE):
+            border = empty[:, pts][:, :, None] & (values == color)
+            flat = np.broadcast_to((rows * self.size + region)[:, :, None], border.shape)[border]
+            touches[color] = (np.bincount(flat, minlength=n * self.size) > 0).reshape(n, self.size)
+        region_idx = np.minimum(region, self.size - 1)
+        black_region = touches[BLACK][rows, region_idx] & empty[:, pts]
+        white_region = touches[WHITE][rows, region_idx] & empty[:, pts]
+        black = (boards == BLACK).sum(axis=1) + (black_region & ~white_region).sum(axis=1)
+        white = (boards == WHITE).sum(axis=1) + (white_region & ~black_region).sum(axis=1)
+
+        winners = []
+        for b, w in zip(black, white):
+            if b > w + self.komi:
+                winners.append(Player.black)
+            elif b < w + self.komi:
+                winners.append(Player.white)
+            else:
+                winners.append(None)
+        return winners
@@ -0,0 +1,162 @@
+import numpy as np
+
+from dlgo.goboard import Move
+from dlgo.gotypes import Player, Point
+from mcts.mcts import MCTSNode
+
+__all__ = [
+    'load_tree',
+    'save_tree',
+]
+
+# move codes; points are stored as (row - 1) * num_cols + (col - 1)
+NO_MOVE = -1
+PASS = -2
+RESIGN = -3
+
+NODE_DTYPE = np.dtype([
+    ('parent', np.int32),
+    ('first_child', np.int32),
+    ('num_children', np.int32),
+    ('move', np.int32),
+    ('player', np.int8),
+    ('hash', np.uint64),
+    ('num_rollouts', np.int32),
+    ('black_wins', np.int32),
+    ('white_wins', np.int32),
+    ('amaf_rollouts', np.int32),
+    ('amaf_black_wins', np.int32),
+    ('amaf_white_wins', np.int32),
+])
+
+PLAYER_CODE = {Player.black: 1, Player.white: 2}
+CODE_PLAYER = {1: Player.black, 2: Player.white}
+
+
+def encode_move(move, num_cols):
+    if move is None:
+        return NO_MOVE
+    if move.is_pass:
+        return PASS
+    if move.is_resign:
+        return RESIGN
+    return (move.point.row - 1) * num_cols + (move.point.col - 1)
+
+
+def decode_move(code, num_cols):
+    if code == NO_MOVE:
+        return None
+    if code == PASS:
+        return Move.pass_turn()
+    if code == RESIGN:
+        return Move.resign()
+    return Move.play(Point(row=code // num_cols + 1, col=code % num_cols + 1))
+
+
+def node_position(node):
+    # a checkpoint node that was never materialized still knows its hash
+    if isinstance(node, CheckpointNode) and node._game_state is None:
+        record = node.tree[node.index]
+        return int(record['hash']), CODE_PLAYER[int(record['player'])]
+    return node.game_state.board.zobrist_hash(), node.game_state.next_player
+
+
+def save_tree(root, path):
+    """Write the tree below root to path as a flat .npy array of
+    NODE_DTYPE records in breadth-first order, so that the children of
+    every node are contiguous.
+    """
+    num_cols = root.game_state.board.num_cols
+    records = []
+    queue = [(root, -1)]
+    head = 0
+    while head < len(queue):
+        node, parent = queue[head]
+        index = head
+        head += 1
+        children = node.children
+        position_hash, player = node_position(node)
+        records.append((
+            parent,
+            len(queue),
+            len(children),
+            encode_move(node.move if parent >= 0 else None, num_cols),
+            PLAYER_CODE[player],
+            position_hash,
+            node.num_rollouts,
+            node.win_counts[Player.black],
+            node.win_counts[Player.white],
+            node.amaf_rollouts,
+            node.amaf_wins[Player.black],
+            node.amaf_wins[Player.white],
+        ))
+        for child in children:
+            queue.append((child, index))
+    np.save(path, np.array(records, dtype=NODE_DTYPE))
+
+
+def load_tree(path, game_state, widening=None, mmap=True):
+    """Load a tree written by save_tree as the root for game_state.
+
+    The file is memory mapped and nodes are only built when the search
+    reaches them: children on first access, and game states by replaying
+    the move from the parent, checked against the stored hash. Raises
+    ValueError if the file was saved for a different position.
+    """
+    tree = np.load(path, mmap_mode='r' if mmap else None)
+    if tree.dtype != NODE_DTYPE or len(tree) == 0:
+        raise ValueError('%s is not a saved MCTS tree' % path)
+    root = tree[0]
+    if int(root['hash']) != game_state.board.zobrist_hash() or \
+            CODE_PLAYER[int(root['player'])] != game_state.next_player:
+        raise ValueError('%s was saved for a different position' % path)
+    return CheckpointNode(tree, 0, game_state.board.num_cols, game_state=game_state,
+                          widening=widening)
+
+
+class CheckpointNode(MCTSNode):
+    """MCTSNode backed by a record of a saved tree."""
+    def __init__(self, tree, index, num_cols, parent=None, game_state=None, widening=None):
+        record = tree[index]
+        MCTSNode.__init__(self, game_state, parent,
+                          decode_move(int(record['move']), num_cols), widening)
+        self.tree = tree
+        self.index = index
+        self.num_cols = num_cols
+        # the saved children are built on first access
+        self._children = None
+        self.num_rollouts = int(record['num_rollouts'])
+        self.win_counts[Player.black] = int(record['black_wins'])
+        self.win_counts[Player.white] = int(record['white_wins'])
+        self.amaf_rollouts = int(record['amaf_rollouts'])
+        self.amaf_wins[Player.black] = int(record['amaf_black_wins'])
+        self.amaf_wins[Player.white] = int(record['amaf_white_wins'])
+
+    @property
+    def game_state(self):
+        if self._game_state is None:
+            game_state = self.parent.game_state.apply_move(self.move)
+            if game_state.board.zobrist_hash() != int(self.tree[self.index]['hash']):
+                raise ValueError('saved tree does not match the replayed position')
+            self._game_state = game_state
+        return self._game_state
+
+    @game_state.setter
+    def game_state(self, game_state):
+        self._game_state = game_state
+
+    @property
+    def children(self):
+        if self._children is None:
+            record = self.tree[self.index]
+            first = int(record['first_child'])
+            self._children = [
+                CheckpointNode(self.tree, first + i, self.num_cols, self,
+                               widening=self.widening)
+                for i in range(int(record['num_children']))
+            ]
+        return self._children
+
+    @children.setter
+    def children(self, children):
+        self._children = children
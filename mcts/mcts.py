@@ -1,26 +1,122 @@
 import math
 import random
+import threading
+import time
 
 from dlgo import agent
-from dlgo.gotypes import Player
+from dlgo.goboard import Move
+from dlgo.gotypes import Player, Point
+from mcts.batch_rollout import BatchRollout
+from mcts.report import SearchReport, move_to_str
 
 __all__ = [
     'MCTSAgent',
 ]   
 
 
+def area_estimate(board):
+    """Return black minus white counting stones and eyes (empty points
+    surrounded by one colour), the number of empty points that are still
+    open and the number of stones in strings with fewer than two eyes,
+    which could still be captured.
+    """
+    diff = board.num_stones(Player.black) - board.num_stones(Player.white)
+    open_points = 0
+    eyes = {}
+    # the strings by id, as GoString equality compares whole stone sets
+    strings = {}
+    for point, go_string in board._grid.items():
+        if go_string is not None:
+            strings[id(go_string)] = go_string
+    for point in board._empty:
+        owners = set(board.get(n) for n in board.neighbor_table[point])
+        if len(owners) != 1 or None in owners:
+            open_points += 1
+            continue
+        color = owners.pop()
+        eyes[point] = color
+        diff += 1 if color == Player.black else -1
+    unsettled = 0
+    for go_string in strings.values():
+        num_eyes = sum(1 for p in go_string.liberties if eyes.get(p) == go_string.color)
+        if num_eyes < 2:
+            unsettled += len(go_string.stones)
+    return diff, open_points, unsettled
+
+
+def could_cut_off(board, margin, komi):
+    """Cheap necessary condition for the margin cutoff, from the counts
+    the board keeps up to date. Eyes are a subset of the points the board
+    counts as territory, so the lead is at most the stone lead plus all
+    territory, and at least the empty points outside territory are open.
+    """
+    territory = board.num_territory(Player.black) + board.num_territory(Player.white)
+    stone_lead = board.num_stones(Player.black) - board.num_stones(Player.white) - komi
+    empty = len(board._empty)
+    return abs(stone_lead) + territory > empty - territory + margin
+
+
+def rollout_cutoff(game, num_moves, max_moves=None, margin=None, komi=7.5, interval=4):
+    """Decide a rollout early. Returns the winner when the rollout has run
+    max_moves moves, or when the lead is more than margin larger than the
+    open points and capturable stones could overturn. None to keep playing.
+
+    The margin test scans the board, so it only runs every interval moves
+    and when could_cut_off allows it.
+    """
+    reached_limit = max_moves is not None and num_moves >= max_moves
+    if not reached_limit:
+        if margin is None or num_moves % interval != 0 or \
+                not could_cut_off(game.board, margin, komi):
+            return None
+    diff, open_points, unsettled = area_estimate(game.board)
+    lead = diff - komi
+    # a captured stone swings the count by two
+    if reached_limit or abs(lead) > open_points + 2 * unsettled + margin:
+        return Player.black if lead > 0 else Player.white
+    return None
+
+
 class MCTSNode(object):
-    def __init__(self, game_state, parent=None, move=None):
+    def __init__(self, game_state, parent=None, move=None, widening=None):
         self.game_state = game_state
         self.parent = parent
         self.move = move
+        # (constant, exponent) for progressive widening, None to allow
+        # every legal move as a child
+        self.widening = widening
         self.win_counts = {
             Player.black: 0,
             Player.white: 0,
         }
         self.num_rollouts = 0
+        # all-moves-as-first statistics for self.move, used by RAVE
+        self.amaf_wins = {
+            Player.black: 0,
+            Player.white: 0,
+        }
+        self.amaf_rollouts = 0
         self.children = []
-        self.unvisited_moves = game_state.legal_moves()
+        # candidate moves are generated on the first expansion and only
+        # checked for legality when they are picked, so leaves that are
+        # never expanded cost nothing
+        self.unvisited_moves = None
+        self.next_move = None
+
+    def candidate_moves(self):
+        # same move set as legal_moves(), without the validity checks
+        if self.game_state.is_over():
+            return []
+        board = self.game_state.board
+        moves = []
+        for row in range(1, board.num_rows + 1):
+            for col in range(1, board.num_cols + 1):
+                point = Point(row, col)
+                if board.get(point) is None:
+                    moves.append(Move.play(point))
+        moves.append(Move.pass_turn())
+        moves.append(Move.resign())
+        return moves
 
     def add_random_child(self):
         # select a child at random
@@ -29,10 +125,11 @@ class MCTSNode(object):
         # create a child MCTS node
         # add it to the children list of current node
 
-        index = random.randint(0, len(self.unvisited_moves) - 1)
-        new_move = self.unvisited_moves.pop(index)
+        # can_add_child has already drawn and validated the move
+        new_move = self.next_move
+        self.next_move = None
         child_game_state = self.game_state.apply_move(new_move)
-        child_node = MCTSNode(child_game_state, self, new_move)
+        child_node = MCTSNode(child_game_state, self, new_move, self.widening)
         self.children.append(child_node)
         return child_node        
 
@@ -43,9 +140,42 @@ class MCTSNode(object):
         # win_counts: which track black and white wins per node
         self.num_rollouts += 1
         self.win_counts[winner] += 1
+
+    def record_amaf(self, winner, points):
+        # every child whose move the player to move here played at some
+        # point later in the game shares the result of the rollout
+        for child in self.children:
+            if child.move.is_play and child.move.point in points:
+                child.amaf_rollouts += 1
+                child.amaf_wins[winner] += 1
         
     def can_add_child(self):
-        return len(self.unvisited_moves) > 0
+        if self.next_move is not None:
+            return True
+        if self.widening is not None and \
+                len(self.children) >= self.max_children():
+            return False
+        if self.unvisited_moves is None:
+            # a node loaded from a checkpoint may already have children
+            expanded = set(child.move for child in self.children)
+            self.unvisited_moves = [move for move in self.candidate_moves()
+                                    if move not in expanded]
+        # draw candidates at random until one turns out to be legal
+        moves = self.unvisited_moves
+        while moves:
+            index = random.randint(0, len(moves) - 1)
+            moves[index], moves[-1] = moves[-1], moves[index]
+            move = moves.pop()
+            if self.game_state.is_valid_move(move):
+                self.next_move = move
+                return True
+        return False
+
+    def max_children(self):
+        # progressive widening: allow ceil(c * n^alpha) children after n
+        # rollouts through this node
+        constant, exponent = self.widening
+        return max(1, int(math.ceil(constant * (self.num_rollouts + 1) ** exponent)))
         
 
     def is_terminal(self):
@@ -54,14 +184,61 @@ class MCTSNode(object):
     def winning_frac(self, player):
         return float(self.win_counts[player]) / float(self.num_rollouts)
 
+    def amaf_frac(self, player):
+        return float(self.amaf_wins[player]) / float(self.amaf_rollouts)
+
 
 class MCTSAgent(agent.Agent):
-    def __init__(self, num_rounds, temperature):
+    def __init__(self, num_rounds, temperature, reuse_tree=True, rollouts_per_leaf=1,
+                 rave=False, rave_equivalence=1000, rave_schedule=None, widening=None,
+                 playout=None, rollout_limit=None, rollout_margin=None,
+                 report_path=None, ponder=False, ponder_limit=None, opening_book=None,
+                 verbose=False):
         agent.Agent.__init__(self)
         # num of simulations
         self.num_rounds = num_rounds
         # temperature
         self.temperature = temperature
+        # keep the search tree between moves
+        self.reuse_tree = reuse_tree
+        self.root = None
+        # random games played from each new leaf, more than one are
+        # played together by the batched rollout engine
+        self.rollouts_per_leaf = rollouts_per_leaf
+        self.batch_rollout = None
+        # RAVE blends the AMAF win rate into UCT with weight beta, which
+        # rave_schedule computes from the child's rollout count. The default
+        # is sqrt(k / (3n + k)) with k = rave_equivalence
+        self.rave = rave
+        self.rave_equivalence = rave_equivalence
+        self.rave_schedule = rave_schedule
+        # (constant, exponent) for progressive widening, e.g. (2.0, 0.5)
+        self.widening = widening
+        # rollout policy with a simulate(game_state, record_moves) method,
+        # such as PatternRollout. None plays FastRandomBot games
+        self.playout = playout
+        # early termination of rollouts: stop after rollout_limit moves, or
+        # once the lead can no longer be overturned with rollout_margin to
+        # spare, and score the position as it stands. PatternRollout takes
+        # the same options in its constructor
+        self.rollout_limit = rollout_limit
+        self.rollout_margin = rollout_margin
+        # statistics of the last search, also appended to report_path as
+        # JSON lines if it is set
+        self.report_path = report_path
+        self.last_report = None
+        # keep searching below our chosen move in a background thread until
+        # the next select_move call, at most ponder_limit rounds. Needs
+        # reuse_tree to hand the result over
+        self.ponder = ponder
+        self.ponder_limit = ponder_limit
+        self.ponder_thread = None
+        self.ponder_stop = threading.Event()
+        self.ponder_rounds = 0
+        # OpeningBook consulted before searching
+        self.opening_book = opening_book
+        # print the chosen move and its win rate after each search
+        self.verbose = verbose
 
 
     def select_move(self, game_state):
@@ -69,25 +246,33 @@ class MCTSAgent(agent.Agent):
         # once we simulate games, we collect scores and develop a statistics
         # once we develop scores for all the children, we select the child with the best score
 
-        # initialize the root node
-        root = MCTSNode(game_state)        # for num_of_rounds, run the loop
-        for i in range(self.num_rounds):
-            node = root
-            # selection
-            while (not node.can_add_child()) and (not node.is_terminal()):
-                node = self.select_child(node)
-
-            # We select a random child out of unvisited children. selection
-            if node.can_add_child():
-                node = node.add_random_child()
+        ponder_rounds = self.stop_pondering()
 
-            # Simulate a random game from this node. Rollout
-            winner = self.simulate_random_game(node.game_state)
+        if self.opening_book is not None:
+            book_move = self.opening_book.select_move(game_state)
+            if book_move is not None:
+                return book_move
 
-            # Propagate scores back up the tree. Backpropogation
-            while node is not None:
-                node.record_win(winner)
-                node = node.parent
+        # initialize the root node, starting from the previous search if
+        # it already explored this position
+        root = None
+        if self.reuse_tree:
+            root = self.promote_subtree(game_state)
+        if root is None:
+            root = MCTSNode(game_state, widening=self.widening)
+        self.root = root
+        timings = {
+            'selection': 0.0,
+            'expansion': 0.0,
+            'rollout': 0.0,
+            'backup': 0.0,
+        }
+        num_rollouts = 0
+        start = time.perf_counter()
+        # for num_of_rounds, run the loop
+        for i in range(self.num_rounds):
+            num_rollouts += self.run_round(root, timings)
+        elapsed = time.perf_counter() - start
 
         # Having performed as many MCTS rounds as we have time for, we
         # now pick a move.
@@ -98,8 +283,179 @@ class MCTSAgent(agent.Agent):
             if child_pct > best_pct:
                 best_pct = child_pct
                 best_move = child.move
-        print('Select move %s with win pct %.3f' % (best_move, best_pct))
+        if self.verbose:
+            print('Select move %s with win pct %.3f' % (best_move, best_pct))
+
+        self.last_report = self.build_report(
+            root, best_move, best_pct, num_rollouts, elapsed, timings, ponder_rounds)
+        if self.report_path is not None:
+            self.last_report.write_jsonl(self.report_path)
+
+        if self.ponder and self.reuse_tree:
+            for child in root.children:
+                if child.move == best_move:
+                    self.start_pondering(child)
         return best_move
+
+    def run_round(self, root, timings):
+        """One round of selection, expansion, rollout and backup below
+        root. Adds the time spent in each phase to timings and returns the
+        number of rollouts played.
+        """
+        t0 = time.perf_counter()
+        node = root
+        # selection
+        while (not node.can_add_child()) and (not node.is_terminal()):
+            node = self.select_child(node)
+        t1 = time.perf_counter()
+
+        # We select a random child out of unvisited children. selection
+        if node.can_add_child():
+            node = node.add_random_child()
+        t2 = time.perf_counter()
+
+        # Simulate random games from this node. Rollout
+        results = self.rollout(node.game_state)
+        t3 = time.perf_counter()
+
+        # Propagate scores back up the tree. Backpropogation
+        for winner, played in results:
+            self.backpropagate(node, winner, played)
+        t4 = time.perf_counter()
+
+        timings['selection'] += t1 - t0
+        timings['expansion'] += t2 - t1
+        timings['rollout'] += t3 - t2
+        timings['backup'] += t4 - t3
+        return len(results)
+
+    def start_pondering(self, node):
+        """Search below node, the position after our move, while the
+        opponent thinks. The next select_move stops the thread and
+        promote_subtree picks up the opponent's reply from node's children.
+
+        The thread holds the GIL while it searches, so this only gains time
+        when the opponent runs elsewhere, as with a human or a remote engine.
+        """
+        self.ponder_stop.clear()
+        self.ponder_rounds = 0
+
+        def ponder():
+            timings = dict.fromkeys(('selection', 'expansion', 'rollout', 'backup'), 0.0)
+            while not self.ponder_stop.is_set() and not node.is_terminal():
+                if self.ponder_limit is not None and self.ponder_rounds >= self.ponder_limit:
+                    break
+                self.run_round(node, timings)
+                self.ponder_rounds += 1
+
+        self.ponder_thread = threading.Thread(target=ponder, daemon=True)
+        self.ponder_thread.start()
+
+    def stop_pondering(self):
+        """Stop the pondering thread, if any, and return the number of
+        rounds it searched. Call this when the game is over.
+        """
+        if self.ponder_thread is None:
+            return 0
+        self.ponder_stop.set()
+        self.ponder_thread.join()
+        self.ponder_thread = None
+        return self.ponder_rounds
+
+    def build_report(self, root, best_move, best_pct, num_rollouts, elapsed, timings,
+                     ponder_rounds=0):
+        tree_size = 0
+        max_depth = 0
+        stack = [(root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            tree_size += 1
+            max_depth = max(max_depth, depth)
+            for child in node.children:
+                stack.append((child, depth + 1))
+
+        player = root.game_state.next_player
+        children = []
+        if root.children:
+            log_rollouts = math.log(sum(child.num_rollouts for child in root.children))
+            for child in root.children:
+                children.append({
+                    'move': move_to_str(child.move),
+                    'visits': child.num_rollouts,
+                    'wins': child.win_counts[player],
+                    'uct': self.uct_score(root, child, log_rollouts),
+                })
+            children.sort(key=lambda c: c['visits'], reverse=True)
+
+        # follow the most visited child down the tree
+        principal_variation = []
+        node = root
+        while node.children:
+            node = max(node.children, key=lambda child: child.num_rollouts)
+            principal_variation.append(move_to_str(node.move))
+
+        return SearchReport(
+            move=move_to_str(best_move),
+            win_pct=best_pct,
+            num_rounds=self.num_rounds,
+            num_rollouts=num_rollouts,
+            elapsed=elapsed,
+            tree_size=tree_size,
+            max_depth=max_depth,
+            children=children,
+            principal_variation=principal_variation,
+            timings=timings,
+            ponder_rounds=ponder_rounds,
+        )
+
+    @staticmethod
+    def backpropagate(node, winner, played=None):
+        while node is not None:
+            node.record_win(winner)
+            if played is not None:
+                node.record_amaf(winner, played[node.game_state.next_player])
+                # moves inside the tree count as played too, for the
+                # nodes above them
+                if node.parent is not None and node.move.is_play:
+                    played[node.parent.game_state.next_player].add(node.move.point)
+            node = node.parent
+
+    def rave_beta(self, num_rollouts):
+        if self.rave_schedule is not None:
+            return self.rave_schedule(num_rollouts)
+        k = self.rave_equivalence
+        return math.sqrt(k / (3.0 * num_rollouts + k))
+
+    def promote_subtree(self, game_state):
+        """Find the node for game_state among the grandchildren of the
+        last root (our move, then the opponent's reply) and make it the
+        new root. The root itself is kept if it is already at game_state.
+        Returns None if the position was never expanded.
+        """
+        if self.root is None:
+            return None
+        # a root set up for this very position, e.g. a loaded checkpoint
+        if self.same_position(self.root.game_state, game_state):
+            return self.root
+        if game_state.previous_state is None:
+            return None
+        our_move = game_state.previous_state.last_move
+        their_move = game_state.last_move
+        for child in self.root.children:
+            if child.move != our_move:
+                continue
+            for grandchild in child.children:
+                if grandchild.move == their_move and \
+                        self.same_position(grandchild.game_state, game_state):
+                    # detach it so the rest of the old tree can be freed
+                    grandchild.parent = None
+                    return grandchild
+        return None
+
+    @staticmethod
+    def same_position(a, b):
+        return a.next_player == b.next_player and \
+            a.board.zobrist_hash() == b.board.zobrist_hash()
             
     def select_child(self, node):
         """Select a child according to the upper confidence bound for
@@ -113,21 +469,96 @@ class MCTSAgent(agent.Agent):
         # Loop over each child.
         for child in node.children:
             # Calculate the UCT score.
-            win_percentage = child.winning_frac(node.game_state.next_player)
-            exploration_factor = math.sqrt(log_rollouts / child.num_rollouts)
-            uct_score = win_percentage + self.temperature * exploration_factor
+            uct_score = self.uct_score(node, child, log_rollouts)
             # Check if this is the largest we've seen so far.
             if uct_score > best_score:
                 best_score = uct_score
                 best_child = child
         return best_child
+
+    def uct_score(self, node, child, log_rollouts):
+        win_percentage = child.winning_frac(node.game_state.next_player)
+        if self.rave and child.amaf_rollouts > 0:
+            beta = self.rave_beta(child.num_rollouts)
+            win_percentage = (1 - beta) * win_percentage + \
+                beta * child.amaf_frac(node.game_state.next_player)
+        exploration_factor = math.sqrt(log_rollouts / child.num_rollouts)
+        return win_percentage + self.temperature * exploration_factor
+
+    def rollout(self, game_state):
+        """Play rollouts_per_leaf games from game_state. Each result is a
+        winner and, with RAVE, the points each player played.
+        """
+        if self.playout is not None:
+            results = []
+            for _ in range(self.rollouts_per_leaf):
+                if self.rave:
+                    results.append(self.playout.simulate(game_state, record_moves=True))
+                else:
+                    results.append((self.playout.simulate(game_state), None))
+            return results
+        if self.rollouts_per_leaf > 1:
+            return self.simulate_batch(game_state)
+        if self.rave:
+            return [self.simulate_random_game_with_moves(
+                game_state, self.rollout_limit, self.rollout_margin)]
+        return [(self.simulate_random_game(
+            game_state, self.rollout_limit, self.rollout_margin), None)]
+
+    def simulate_batch(self, game_state):
+        board = game_state.board
+        if self.batch_rollout is None or \
+                self.batch_rollout.num_rows != board.num_rows or \
+                self.batch_rollout.num_cols != board.num_cols:
+            self.batch_rollout = BatchRollout(
+                board.num_rows, board.num_cols,
+                max_moves=self.rollout_limit, margin=self.rollout_margin)
+        if self.rave:
+            winners, played = self.batch_rollout.simulate(
+                game_state, self.rollouts_per_leaf, record_moves=True)
+            return list(zip(winners, played))
+        winners = self.batch_rollout.simulate(game_state, self.rollouts_per_leaf)
+        return [(winner, None) for winner in winners]
+
     @staticmethod
-    def simulate_random_game(game):
+    def simulate_random_game(game, max_moves=None, margin=None):
         bots = {
             Player.black: agent.FastRandomBot(),
             Player.white: agent.FastRandomBot(),
         }
+        num_moves = 0
+        while not game.is_over():
+            winner = rollout_cutoff(game, num_moves, max_moves, margin)
+            if winner is not None:
+                return winner
+            bot_move = bots[game.next_player].select_move(game)
+            game = game.apply_move(bot_move)
+            num_moves += 1
+        return game.winner()
+
+    @staticmethod
+    def simulate_random_game_with_moves(game, max_moves=None, margin=None):
+        """Like simulate_random_game, but also return the set of points
+        each player played first during the rollout.
+        """
+        bots = {
+            Player.black: agent.FastRandomBot(),
+            Player.white: agent.FastRandomBot(),
+        }
+        played = {
+            Player.black: set(),
+            Player.white: set(),
+        }
+        seen = set()
+        num_moves = 0
         while not game.is_over():
+            winner = rollout_cutoff(game, num_moves, max_moves, margin)
+            if winner is not None:
+                return winner, played
             bot_move = bots[game.next_player].select_move(game)
+            if bot_move.is_play and bot_move.point not in seen:
+                seen.add(bot_move.point)
+                played[game.next_player].add(bot_move.point)
             game = game.apply_move(bot_move)
-        return game.winner()
\ No newline at end of file
+            num_moves += 1
+        return game.winner(), played
\ No newline at end of file
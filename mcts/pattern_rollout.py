@@ -0,0 +1,513 @@
+import random
+
+from dlgo.gotypes import Player, Point
+from mcts.batch_rollout import simple_ko_point
+
+__all__ = [
+    'FenwickTree',
+    'PatternRollout',
+]
+
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+BORDER = 3
+
+# weights multiplied into the pattern weight by the tactical heuristics
+CAPTURE_WEIGHT = 30.0
+ESCAPE_WEIGHT = 20.0
+
+# 3x3 pattern weights for black and white to move, indexed by pattern
+# code. Built on first use.
+PATTERN_WEIGHTS = {}
+
+
+def _eye_owner(orth_code):
+    # colour whose stones and the edge surround the point, 0 if none
+    values = [(orth_code >> (2 * k)) & 3 for k in range(4)]
+    for color in (BLACK, WHITE):
+        if all(v == color or v == BORDER for v in values):
+            return color
+    return EMPTY
+
+
+# owner of an empty point by the low byte of its pattern code, which holds
+# the four orthogonal neighbours
+EYE_OWNER = [_eye_owner(code) for code in range(4 ** 4)]
+
+
+class FenwickTree(object):
+    """Binary indexed tree over non negative weights. Setting a weight and
+    drawing an index with probability proportional to its weight both
+    take O(log n).
+    """
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0.0] * (size + 1)
+        self.values = [0.0] * size
+        self.total = 0.0
+        self.top = 1
+        while self.top * 2 <= size:
+            self.top *= 2
+
+    def get(self, index):
+        return self.values[index]
+
+    def set(self, index, value):
+        delta = value - self.values[index]
+        if delta == 0:
+            return
+        self.values[index] = value
+        self.total += delta
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def find(self, target):
+        """Return the first index whose prefix sum is greater than target."""
+        pos = 0
+        bit = self.top
+        while bit:
+            nxt = pos + bit
+            if nxt <= self.size and self.tree[nxt] <= target:
+                pos = nxt
+                target -= self.tree[nxt]
+            bit >>= 1
+        return min(pos, self.size - 1)
+
+    def sample(self):
+        return self.find(random.random() * self.total)
+
+
+def _pattern_weight(code, color):
+    """Weight of playing color at an empty point whose 3x3 surroundings
+    are described by code. Neighbours are stored two bits each in the order
+    N, S, W, E, NW, NE, SW, SE.
+    """
+    values = [(code >> (2 * k)) & 3 for k in range(8)]
+    orth = values[:4]
+    diag = values[4:]
+    opponent = 3 - color
+
+    # never fill our own eye, same rule as is_point_an_eye
+    if all(v == color or v == BORDER for v in orth):
+        friendly_corners = diag.count(color)
+        off_board_corners = diag.count(BORDER)
+        if off_board_corners > 0:
+            if off_board_corners + friendly_corners == 4:
+                return 0.0
+        elif friendly_corners >= 3:
+            return 0.0
+
+    stones = [v for v in values if v == BLACK or v == WHITE]
+    if not stones:
+        # nothing nearby: the first line is a poor place to start
+        return 0.2 if BORDER in orth else 1.0
+
+    weight = 1.0
+    if any(v == BLACK or v == WHITE for v in orth):
+        # contact play
+        weight *= 2.0
+    # cutting point: opponent stones on two adjacent sides that are not
+    # joined through the corner between them
+    for a, b, corner in ((0, 2, 0), (0, 3, 1), (1, 2, 2), (1, 3, 3)):
+        if orth[a] == opponent and orth[b] == opponent and diag[corner] != opponent:
+            weight *= 3.0
+            break
+    # hane: touching an opponent stone that sits next to one of ours
+    for side, corners in ((0, (0, 1)), (1, (2, 3)), (2, (0, 2)), (3, (1, 3))):
+        if orth[side] == opponent and any(diag[c] == color for c in corners):
+            weight *= 1.5
+            break
+    return weight
+
+
+def pattern_weights(color):
+    if color not in PATTERN_WEIGHTS:
+        PATTERN_WEIGHTS[color] = [_pattern_weight(code, color) for code in range(4 ** 8)]
+    return PATTERN_WEIGHTS[color]
+
+
+class PatternRollout(object):
+    """Heavy playout policy for MCTS rollouts.
+
+    Plays on its own flat board with a one point border and keeps, for
+    every point, the 3x3 pattern code of its neighbours up to date as
+    stones are placed and captured. Each empty point carries the table
+    weight of its pattern in one Fenwick tree per colour, so a move is drawn
+    in O(log n). Capturing an opponent string in atari and saving one of
+    ours next to the last move are boosted on top of the patterns.
+    Legality is only checked for the drawn move, and ko is simple ko.
+
+    Stone and eye counts are kept incrementally too, so that with margin
+    set a playout stops as soon as the lead is more than margin larger
+    than what the open points and the capturable stones (strings without
+    two eyes) could overturn. A playout also stops after max_moves.
+    """
+    def __init__(self, komi=7.5, max_moves=None, margin=None):
+        self.komi = komi
+        self.max_moves = max_moves
+        self.margin = margin
+        self.dim = None
+
+    def _init_tables(self, num_rows, num_cols):
+        self.dim = (num_rows, num_cols)
+        s = num_cols + 2
+        self.stride = s
+        self.size = (num_rows + 2) * s
+        self.orth = (-s, s, -1, 1)
+        # N, S, W, E, NW, NE, SW, SE, the order of the pattern code
+        self.around = (-s, s, -1, 1, -s - 1, -s + 1, s - 1, s + 1)
+        self.points = []
+        self.point_at = {}
+        self.position = {}
+        for r in range(1, num_rows + 1):
+            for c in range(1, num_cols + 1):
+                p = r * s + c
+                self.position[p] = len(self.points)
+                self.points.append(p)
+                self.point_at[p] = Point(row=r, col=c)
+        self.weights = {
+            BLACK: pattern_weights(BLACK),
+            WHITE: pattern_weights(WHITE),
+        }
+
+    def _setup(self, game_state):
+        board = game_state.board
+        if self.dim != (board.num_rows, board.num_cols):
+            self._init_tables(board.num_rows, board.num_cols)
+        s = self.stride
+        self.board = [BORDER] * self.size
+        for p in self.points:
+            self.board[p] = EMPTY
+        self.head = [0] * self.size
+        self.stones = {}
+        self.libs = {}
+        for point, go_string in board._grid.items():
+            if go_string is None:
+                continue
+            p = point.row * s + point.col
+            self.board[p] = go_string.color.value
+            head = min(q.row * s + q.col for q in go_string.stones)
+            self.head[p] = head
+            if head not in self.stones:
+                self.stones[head] = [q.row * s + q.col for q in go_string.stones]
+                self.libs[head] = set(q.row * s + q.col for q in go_string.liberties)
+
+        self.codes = [0] * self.size
+        for p in self.points:
+            code = 0
+            for k, d in enumerate(self.around):
+                code |= self.board[p + d] << (2 * k)
+            self.codes[p] = code
+        # stones and eyes of each colour, indexed by colour value
+        self.stone_counts = [0, 0, 0]
+        self.eye_counts = [0, 0, 0]
+        self.num_empty = 0
+        for p in self.points:
+            v = self.board[p]
+            if v == EMPTY:
+                self.num_empty += 1
+                self.eye_counts[EYE_OWNER[self.codes[p] & 0xff]] += 1
+            else:
+                self.stone_counts[v] += 1
+        self.trees = {
+            BLACK: FenwickTree(len(self.points)),
+            WHITE: FenwickTree(len(self.points)),
+        }
+        for p in self.points:
+            if self.board[p] == EMPTY:
+                self._refresh(p)
+
+    def _refresh(self, p):
+        i = self.position[p]
+        if self.board[p] == EMPTY:
+            code = self.codes[p]
+            self.trees[BLACK].set(i, self.weights[BLACK][code])
+            self.trees[WHITE].set(i, self.weights[WHITE][code])
+        else:
+            self.trees[BLACK].set(i, 0.0)
+            self.trees[WHITE].set(i, 0.0)
+
+    def _set_point(self, p, value):
+        # update the point and the pattern codes of its eight neighbours
+        old = self.board[p]
+        if old == EMPTY:
+            self.num_empty -= 1
+            self.eye_counts[EYE_OWNER[self.codes[p] & 0xff]] -= 1
+        else:
+            self.stone_counts[old] -= 1
+        delta = value - old
+        self.board[p] = value
+        for k, d in enumerate(self.around):
+            q = p - d
+            if self.board[q] == BORDER:
+                continue
+            if self.board[q] == EMPTY:
+                if k < 4:
+                    self.eye_counts[EYE_OWNER[self.codes[q] & 0xff]] -= 1
+                    self.codes[q] += delta << (2 * k)
+                    self.eye_counts[EYE_OWNER[self.codes[q] & 0xff]] += 1
+                else:
+                    self.codes[q] += delta << (2 * k)
+                self._refresh(q)
+            else:
+                self.codes[q] += delta << (2 * k)
+        if value == EMPTY:
+            self.num_empty += 1
+            self.eye_counts[EYE_OWNER[self.codes[p] & 0xff]] += 1
+        else:
+            self.stone_counts[value] += 1
+        self._refresh(p)
+
+    def _decided(self):
+        """Colour value of the side whose lead can no longer be overturned,
+        EMPTY while the game is open.
+        """
+        black = self.stone_counts[BLACK] + self.eye_counts[BLACK]
+        white = self.stone_counts[WHITE] + self.eye_counts[WHITE]
+        lead = black - white - self.komi
+        open_points = self.num_empty - self.eye_counts[BLACK] - self.eye_counts[WHITE]
+        # cheap test on the open points alone before looking at strings
+        if abs(lead) <= open_points + self.margin:
+            return EMPTY
+        unsettled = 0
+        for h, libs in self.libs.items():
+            color = self.board[h]
+            num_eyes = 0
+            for q in libs:
+                if EYE_OWNER[self.codes[q] & 0xff] == color:
+                    num_eyes += 1
+            if num_eyes < 2:
+                unsettled += len(self.stones[h])
+        # a captured stone swings the count by two
+        if abs(lead) > open_points + 2 * unsettled + self.margin:
+            return BLACK if lead > 0 else WHITE
+        return EMPTY
+
+    def _is_legal(self, p, color, ko):
+        if p == ko:
+            return False
+        for d in self.orth:
+            q = p + d
+            v = self.board[q]
+            if v == EMPTY:
+                return True
+            if v == BORDER:
+                continue
+            num_libs = len(self.libs[self.head[q]])
+            if v == color and num_libs > 1:
+                return True
+            if v != color and num_libs == 1:
+                return True
+        return False
+
+    def _place(self, p, color):
+        """Play color at p and return the new ko point, or -1."""
+        opponent = 3 - color
+        own = set()
+        enemies = set()
+        libs = set()
+        for d in self.orth:
+            q = p + d
+            v = self.board[q]
+            if v == EMPTY:
+                libs.add(q)
+            elif v == color:
+                own.add(self.head[q])
+            elif v == opponent:
+                enemies.add(self.head[q])
+        self._set_point(p, color)
+
+        # merge into the largest adjacent string
+        head = p
+        stones = [p]
+        if own:
+            head = max(own, key=lambda h: len(self.stones[h]))
+            stones = self.stones[head]
+            stones.append(p)
+            libs |= self.libs[head]
+            for h in own:
+                if h == head:
+                    continue
+                for q in self.stones[h]:
+                    self.head[q] = head
+                stones.extend(self.stones.pop(h))
+                libs |= self.libs.pop(h)
+        self.head[p] = head
+        libs.discard(p)
+        self.stones[head] = stones
+        self.libs[head] = libs
+
+        captured = []
+        for h in enemies:
+            self.libs[h].discard(p)
+            if not self.libs[h]:
+                captured.extend(self._capture(h))
+        if len(captured) == 1 and len(stones) == 1 and len(self.libs[head]) == 1:
+            return captured[0]
+        return -1
+
+    def _capture(self, h):
+        stones = self.stones.pop(h)
+        del self.libs[h]
+        for q in stones:
+            self._set_point(q, EMPTY)
+        for q in stones:
+            for d in self.orth:
+                n = q + d
+                if self.board[n] == BLACK or self.board[n] == WHITE:
+                    self.libs[self.head[n]].add(q)
+        return stones
+
+    def _tactical_boosts(self, color, last):
+        """Weights for capturing or saving strings in atari next to the
+        last move.
+        """
+        boosts = {}
+        if last < 0:
+            return boosts
+        seen = set()
+        for d in (0,) + self.orth:
+            q = last + d
+            v = self.board[q]
+            if v != BLACK and v != WHITE:
+                continue
+            h = self.head[q]
+            if h in seen:
+                continue
+            seen.add(h)
+            libs = self.libs[h]
+            if len(libs) != 1:
+                continue
+            lib = next(iter(libs))
+            if v == color:
+                boosts[lib] = max(boosts.get(lib, 0.0), ESCAPE_WEIGHT)
+            else:
+                boosts[lib] = max(boosts.get(lib, 0.0), CAPTURE_WEIGHT * len(self.stones[h]))
+        return boosts
+
+    def _select(self, color, ko, last):
+        tree = self.trees[color]
+        changed = {}
+        for p, weight in self._tactical_boosts(color, last).items():
+            i = self.position[p]
+            changed[i] = tree.get(i)
+            tree.set(i, max(tree.get(i), 1.0) * weight)
+
+        move = -1
+        while tree.total > 1e-9:
+            i = tree.sample()
+            if tree.get(i) <= 0:
+                # rounding left a zero weight point reachable. The total
+                # is kept by summing deltas, so recount it from the
+                # weights, stop if nothing is left and otherwise fall back
+                # to the heaviest point
+                tree.total = sum(tree.values)
+                if tree.total <= 1e-9:
+                    break
+                i = max(range(tree.size), key=tree.get)
+            p = self.points[i]
+            if self._is_legal(p, color, ko):
+                move = p
+                break
+            # illegal for now, hide it until this move is chosen
+            if i not in changed:
+                changed[i] = tree.get(i)
+            tree.set(i, 0.0)
+
+        for i, weight in changed.items():
+            if self.board[self.points[i]] == EMPTY:
+                tree.set(i, weight)
+        return move
+
+    def simulate(self, game_state, record_moves=False):
+        """Play one game from game_state and return the winner. With
+        record_moves, return (winner, played) where played maps each player
+        to the set of points it played first.
+        """
+        played = {
+            Player.black: set(),
+            Player.white: set(),
+        }
+        if game_state.is_over():
+            winner = game_state.winner()
+            return (winner, played) if record_moves else winner
+
+        self._setup(game_state)
+        ko_point = simple_ko_point(game_state)
+        ko = -1 if ko_point is None else ko_point.row * self.stride + ko_point.col
+        last = -1
+        if game_state.last_move is not None and game_state.last_move.is_play:
+            last = game_state.last_move.point.row * self.stride + game_state.last_move.point.col
+        passes = 1 if game_state.last_move is not None and game_state.last_move.is_pass else 0
+        first = {}
+
+        max_moves = self.max_moves
+        if max_moves is None:
+            max_moves = 3 * len(self.points)
+        color = game_state.next_player.value
+        num_moves = 0
+        winner = None
+        while passes < 2 and num_moves < max_moves:
+            if self.margin is not None:
+                decided = self._decided()
+                if decided != EMPTY:
+                    winner = Player(decided)
+                    break
+            move = self._select(color, ko, last)
+            if move < 0:
+                passes += 1
+                ko = -1
+            else:
+                passes = 0
+                ko = self._place(move, color)
+                if record_moves and move not in first:
+                    first[move] = color
+            last = move
+            color = 3 - color
+            num_moves += 1
+
+        if winner is None:
+            winner = self._winner()
+        if not record_moves:
+            return winner
+        for p, c in first.items():
+            played[Player(c)].add(self.point_at[p])
+        return winner, played
+
+    def _winner(self):
+        # area scoring: stones plus empty regions bordered by one colour
+        score = {BLACK: 0, WHITE: 0}
+        visited = set()
+        for p in self.points:
+            v = self.board[p]
+            if v == BLACK or v == WHITE:
+                score[v] += 1
+                continue
+            if p in visited:
+                continue
+            region = [p]
+            visited.add(p)
+            borders = set()
+            i = 0
+            while i < len(region):
+                q = region[i]
+                i += 1
+                for d in self.orth:
+                    n = q + d
+                    nv = self.board[n]
+                    if nv == EMPTY:
+                        if n not in visited:
+                            visited.add(n)
+                            region.append(n)
+                    elif nv != BORDER:
+                        borders.add(nv)
+            if len(borders) == 1:
+                score[borders.pop()] += len(region)
+        if score[BLACK] > score[WHITE] + self.komi:
+            return Player.black
+        if score[BLACK] < score[WHITE] + self.komi:
+            return Player.white
+        return None
@@ -0,0 +1,45 @@
+import numpy as np
+import torch
+
+from dlgo.goboard import Move
+
+__all__ = [
+    'PolicyNetEvaluator',
+]
+
+
+class PolicyNetEvaluator(object):
+    """PUCTAgent evaluator backed by a policy network such as the
+    notebook's SLPolicyNetwork.
+
+    The model takes a (batch, planes, rows, cols) float tensor made by
+    encoder and returns log probabilities over the board points. All the
+    leaves of a search batch go through a single forward pass. Points the
+    network masked out (probability 0) or that the state's legal move mask
+    rules out get no prior. The value is left to rollouts.
+    """
+    def __init__(self, model, encoder, device='cpu'):
+        self.device = torch.device(device)
+        self.model = model.to(self.device)
+        self.model.eval()
+        self.encoder = encoder
+
+    def evaluate(self, game_states):
+        x = self.encoder.encode_batch(game_states, dtype=np.float32)
+        x = torch.from_numpy(x).to(self.device)
+        with torch.no_grad():
+            probs = torch.exp(self.model(x)).cpu().numpy()
+
+        results = []
+        for game_state, row in zip(game_states, probs):
+            priors = {}
+            total = 0.0
+            legal = game_state.legal_move_mask().ravel()
+            for index in np.flatnonzero((row > 0) & legal):
+                point = self.encoder.decode_point_index(int(index))
+                priors[Move.play(point)] = float(row[index])
+                total += row[index]
+            for move in priors:
+                priors[move] /= total
+            results.append((priors, None))
+        return results
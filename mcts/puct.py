@@ -0,0 +1,222 @@
+import math
+
+from dlgo import agent
+from dlgo.goboard import Move
+from dlgo.gotypes import Point
+from mcts.mcts import MCTSAgent
+
+__all__ = [
+    'PUCTAgent',
+    'UniformEvaluator',
+]
+
+
+class UniformEvaluator(object):
+    """Evaluator interface for PUCTAgent.
+
+    evaluate takes a list of game states and returns one (priors, value)
+    pair per state. priors maps each candidate move to its probability and
+    value is the expected result in [-1, 1] for the player to move, or None
+    to have the search estimate it with a random rollout.
+
+    This one gives every empty point the same prior and leaves the value
+    to rollouts.
+    """
+    def evaluate(self, game_states):
+        results = []
+        for game_state in game_states:
+            board = game_state.board
+            moves = []
+            for r in range(1, board.num_rows + 1):
+                for c in range(1, board.num_cols + 1):
+                    point = Point(row=r, col=c)
+                    if board.get(point) is None:
+                        moves.append(Move.play(point))
+            priors = {move: 1.0 / len(moves) for move in moves}
+            results.append((priors, None))
+        return results
+
+
+class PUCTNode(object):
+    def __init__(self, game_state, parent=None, move=None, prior=1.0):
+        self.game_state = game_state
+        self.parent = parent
+        self.move = move
+        self.prior = prior
+        # priors over the moves from this position, None until evaluated
+        self.priors = None
+        self.children = {}
+        self.visit_count = 0
+        # sum of results for the player who made self.move
+        self.total_value = 0.0
+
+    def is_expanded(self):
+        return self.priors is not None
+
+    def is_terminal(self):
+        return self.game_state.is_over()
+
+    def expand(self, priors, pass_prior=None):
+        # pass is always a candidate, so the search never runs out of
+        # moves and can choose to pass while empty points remain. Unless
+        # the evaluator priced it, it gets pass_prior, by default the
+        # average prior of the other moves
+        priors = dict(priors)
+        pass_move = Move.pass_turn()
+        if pass_move not in priors:
+            if pass_prior is None:
+                pass_prior = sum(priors.values()) / len(priors) if priors else 1.0
+            priors[pass_move] = pass_prior
+        self.priors = priors
+
+    def child(self, move):
+        """Return the child for move, creating it on first use. Priors may
+        include moves that turn out to be illegal (self capture, ko); those
+        are dropped and None is returned.
+        """
+        node = self.children.get(move)
+        if node is None:
+            if not self.game_state.is_valid_move(move):
+                del self.priors[move]
+                return None
+            node = PUCTNode(self.game_state.apply_move(move), self, move, self.priors[move])
+            self.children[move] = node
+        return node
+
+    def q_value(self, move):
+        node = self.children.get(move)
+        if node is None or node.visit_count == 0:
+            return 0.0
+        return node.total_value / node.visit_count
+
+    def child_visits(self, move):
+        node = self.children.get(move)
+        if node is None:
+            return 0
+        return node.visit_count
+
+
+class PUCTAgent(agent.Agent):
+    """Tree search guided by move priors, as in AlphaGo.
+
+    Children are picked by Q + c_puct * P * sqrt(N) / (1 + n). Leaves are
+    collected in batches of batch_size, using a virtual loss so that one
+    batch spreads over different lines, and then handed to the evaluator
+    in a single call.
+
+    Pass is added to every node's priors with pass_prior, or the average
+    prior of the other moves if that is None, unless the evaluator gives
+    it a prior itself.
+    """
+    def __init__(self, evaluator, num_rounds, c_puct=5.0, batch_size=8, virtual_loss=1,
+                 pass_prior=None):
+        agent.Agent.__init__(self)
+        self.evaluator = evaluator
+        self.num_rounds = num_rounds
+        self.c_puct = c_puct
+        self.batch_size = batch_size
+        self.virtual_loss = virtual_loss
+        self.pass_prior = pass_prior
+
+    def select_move(self, game_state):
+        root = PUCTNode(game_state)
+        rounds = 0
+        while rounds < self.num_rounds:
+            batch_size = min(self.batch_size, self.num_rounds - rounds)
+            rounds += self.run_batch(root, batch_size)
+
+        if not root.children:
+            return Move.pass_turn()
+        return max(root.children.values(), key=lambda child: child.visit_count).move
+
+    def run_batch(self, root, batch_size):
+        leaves = []
+        pending = set()
+        for _ in range(batch_size):
+            path = self.select_leaf(root)
+            leaf = path[-1]
+            if id(leaf) in pending:
+                # the batch has run into a leaf that is already queued
+                self.revert_virtual_loss(path)
+                break
+            if not leaf.is_terminal():
+                pending.add(id(leaf))
+            leaves.append(path)
+
+        to_evaluate = [path[-1] for path in leaves if not path[-1].is_terminal()]
+        results = {}
+        if to_evaluate:
+            evaluated = self.evaluator.evaluate([leaf.game_state for leaf in to_evaluate])
+            for leaf, result in zip(to_evaluate, evaluated):
+                results[id(leaf)] = result
+
+        for path in leaves:
+            leaf = path[-1]
+            if leaf.is_terminal():
+                value = self.terminal_value(leaf.game_state)
+            else:
+                priors, value = results[id(leaf)]
+                if not leaf.is_expanded():
+                    leaf.expand(priors, self.pass_prior)
+                if value is None:
+                    value = self.rollout_value(leaf.game_state)
+            self.revert_virtual_loss(path)
+            self.backup(path, value)
+        return len(leaves)
+
+    def select_leaf(self, root):
+        node = root
+        path = [node]
+        self.add_virtual_loss(node)
+        while node.is_expanded() and not node.is_terminal():
+            child = node.child(self.select_child_move(node))
+            if child is None:
+                continue
+            node = child
+            path.append(node)
+            self.add_virtual_loss(node)
+        return path
+
+    def select_child_move(self, node):
+        sqrt_total = math.sqrt(max(node.visit_count, 1))
+        best_score = None
+        best_move = None
+        for move, prior in node.priors.items():
+            visits = node.child_visits(move)
+            score = node.q_value(move) + self.c_puct * prior * sqrt_total / (1 + visits)
+            if best_score is None or score > best_score:
+                best_score = score
+                best_move = move
+        return best_move
+
+    def add_virtual_loss(self, node):
+        node.visit_count += self.virtual_loss
+        node.total_value -= self.virtual_loss
+
+    def revert_virtual_loss(self, path):
+        for node in path:
+            node.visit_count -= self.virtual_loss
+            node.total_value += self.virtual_loss
+
+    @staticmethod
+    def backup(path, value):
+        # value is for the player to move at the leaf, which is the
+        # opponent of whoever made the move into the leaf
+        for node in reversed(path):
+            value = -value
+            node.visit_count += 1
+            node.total_value += value
+
+    @staticmethod
+    def terminal_value(game_state):
+        winner = game_state.winner()
+        if winner is None:
+            return 0.0
+        return 1.0 if winner == game_state.next_player else -1.0
+
+    @staticmethod
+    def rollout_value(game_state):
+        winner = MCTSAgent.simulate_random_game(game_state)
+        if winner is None:
+            return 0.0
+        return 1.0 if winner == game_state.next_player else -1.0
@@ -0,0 +1,65 @@
+import json
+
+from dlgo.utils import COLS
+
+__all__ = [
+    'SearchReport',
+    'move_to_str',
+]
+
+
+def move_to_str(move):
+    if move is None:
+        return None
+    if move.is_pass:
+        return 'pass'
+    if move.is_resign:
+        return 'resign'
+    return '%s%d' % (COLS[move.point.col - 1], move.point.row)
+
+
+class SearchReport(object):
+    """Statistics of one MCTS search.
+
+    children holds one dict per root child with its move, visits, wins
+    and UCT score, all from the point of view of the player to move at the
+    root. timings splits the search time in seconds across the selection,
+    expansion, rollout and backup phases. ponder_rounds counts the rounds
+    searched on the opponent's time before this move.
+    """
+    def __init__(self, move, win_pct, num_rounds, num_rollouts, elapsed,
+                 tree_size, max_depth, children, principal_variation, timings,
+                 ponder_rounds=0):
+        self.move = move
+        self.win_pct = win_pct
+        self.num_rounds = num_rounds
+        self.num_rollouts = num_rollouts
+        self.elapsed = elapsed
+        self.rollouts_per_sec = num_rollouts / elapsed if elapsed > 0 else 0.0
+        self.tree_size = tree_size
+        self.max_depth = max_depth
+        self.children = children
+        self.principal_variation = principal_variation
+        self.timings = timings
+        self.ponder_rounds = ponder_rounds
+
+    def to_dict(self):
+        return {
+            'move': self.move,
+            'win_pct': self.win_pct,
+            'num_rounds': self.num_rounds,
+            'num_rollouts': self.num_rollouts,
+            'elapsed': self.elapsed,
+            'rollouts_per_sec': self.rollouts_per_sec,
+            'tree_size': self.tree_size,
+            'max_depth': self.max_depth,
+            'children': self.children,
+            'principal_variation': self.principal_variation,
+            'timings': self.timings,
+            'ponder_rounds': self.ponder_rounds,
+        }
+
+    def write_jsonl(self, path):
+        """Append the report as one JSON line to path."""
+        with open(path, 'a') as f:
+            f.write(json.dumps(self.to_dict()) + '\n')
@@ -12,7 +12,7 @@ def main():
     board_size = 9
     game = goboard.GameState.new_game(board_size)
     bots = {
-        gotypes.Player.black: mcts.MCTSAgent(temperature=1.41, num_rounds=50),
+        gotypes.Player.black: mcts.MCTSAgent(temperature=1.41, num_rounds=50, verbose=True),
         gotypes.Player.white: agent.FastRandomBot(),
     }
     # Generate random game id and SGF file
@@ -21,6 +21,7 @@ def main():
     # Configuration
     data_dir = "data"
     encoder_name = "fourplane"  # You can change this to other encoders if available
+    packed = False  # bit-pack the 0/1 features; load them with GoDataLoader(num_planes=...)
     file_list = []
     zip_files = []
 
@@ -39,7 +40,7 @@ def main():
     
     try:
         # Initialize the data processor
-        processor = DataProcessor(encoder_name, data_dir)
+        processor = DataProcessor(encoder_name, data_dir, packed=packed)
         
         # Process the SGF files
         with ThreadPoolExecutor(max_workers=12) as executor:
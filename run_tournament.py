@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Script to rate agents against each other in a round-robin tournament.
+Each game is appended to games/tournament.jsonl.
+"""
+
+import functools
+import os
+import sys
+
+# Add the current directory to Python path to import dlgo modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mcts
+from dlgo import agent, minimax
+from dlgo.tournament import SPRT, Tournament
+
+
+def main():
+    """Main function to run the tournament."""
+
+    # Configuration
+    board_size = 9
+    games_per_match = 200
+    results_file = "games/tournament.jsonl"
+
+    players = {
+        "mcts": functools.partial(mcts.MCTSAgent, num_rounds=100, temperature=1.41),
+        "alphabeta": functools.partial(minimax.AlphaBetaAgent, max_depth=2, eval_fn=minimax.capture_diff),
+        "random": agent.FastRandomBot,
+    }
+    # stop a match once one side is clearly 50 Elo stronger or not
+    tournament = Tournament(
+        players,
+        board_size=board_size,
+        games_per_match=games_per_match,
+        sprt=SPRT(elo0=0, elo1=50),
+        results_path=results_file)
+    table, matches = tournament.run()
+
+    for (a, b), (wins, losses, elo, low, high, status) in matches.items():
+        print(f"{a} v {b}: +{wins} -{losses}, {elo:+.0f} Elo [{low:+.0f}, {high:+.0f}]"
+              + (f", SPRT {status}" if status else ""))
+    for name, elo, wins, games in table:
+        print(f"{name:12s} {elo:+7.1f} {wins}/{games}")
+    print(f"{tournament.games_per_sec:.2f} games/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Script to play headless games between two agents on a process pool.
+SGF files go to games/selfplay/ and one JSON line per game to
+games/selfplay/results.jsonl.
+"""
+
+import functools
+import os
+import sys
+
+# Add the current directory to Python path to import dlgo modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mcts
+from dlgo import agent
+from dlgo.selfplay import SelfPlay
+
+
+def main():
+    """Main function to run the self-play games."""
+
+    # Configuration
+    board_size = 9
+    num_games = 100
+    output_dir = "games/selfplay"
+
+    black_factory = functools.partial(mcts.MCTSAgent, num_rounds=50, temperature=1.41)
+    white_factory = agent.FastRandomBot
+
+    self_play = SelfPlay(
+        black_factory, white_factory,
+        board_size=board_size,
+        alternate_colors=True,
+        sgf_dir=output_dir,
+        results_path=f"{output_dir}/results.jsonl")
+    records = self_play.run(
+        num_games,
+        callback=lambda record: print(f"game {record.game_index}: {record.black} v {record.white} {record.result}"))
+
+    wins = {}
+    for record in records:
+        winner = record.black if record.winner == 'B' else record.white
+        wins[winner] = wins.get(winner, 0) + 1
+    print(f"wins: {wins}")
+    print(f"{self_play.games_per_sec:.2f} games/sec")
+
+
+if __name__ == "__main__":
+    main()
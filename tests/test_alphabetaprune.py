@@ -0,0 +1,50 @@
+import random
+
+from dlgo.goboard import GameState, Move
+from dlgo.gotypes import Point
+from dlgo.agent.naive_fast import FastRandomBot
+from dlgo.minimax.alphabetaprune import MAX, MIN, AlphaBetaAgent, MoveOrdering, negamax
+from dlgo.minimax.depthprune import best_result
+from dlgo.minimax.evaluation import capture_diff
+
+
+def test_root_ties_are_broken_at_random():
+    game = GameState.new_game(4)
+    for row, col in [(2, 2), (2, 3), (3, 3)]:
+        game = game.apply_move(Move.play(Point(row, col)))
+    scores = {move: -best_result(game.apply_move(move), 1, capture_diff)
+              for move in game.legal_moves()}
+    best_moves = {move for move, score in scores.items() if score == max(scores.values())}
+
+    agent = AlphaBetaAgent(1, capture_diff)
+    random.seed(0)
+    picked = {agent.select_move(game) for _ in range(60)}
+    assert picked <= best_moves
+    assert len(picked) > 1
+
+
+def minimax(game_state, depth):
+    if game_state.is_over():
+        if game_state.winner() == game_state.next_player:
+            return MAX
+        if game_state.winner() is None:
+            return capture_diff(game_state)
+        return MIN
+    if depth == 0:
+        return capture_diff(game_state)
+    return max(-minimax(game_state.apply_move(move), depth - 1)
+               for move in game_state.legal_moves())
+
+
+def test_negamax_matches_minimax():
+    random.seed(1)
+    bot = FastRandomBot()
+    game = GameState.new_game(4)
+    for _ in range(6):
+        game = game.apply_move(bot.select_move(game))
+        for depth in (1, 2, 3):
+            expected = minimax(game, depth)
+            assert negamax(game, depth, MIN - 1, MAX + 1, capture_diff, MoveOrdering()) == expected
+            # the agent searches the children of the root to max_depth
+            move = AlphaBetaAgent(depth - 1, capture_diff).select_move(game)
+            assert -minimax(game.apply_move(move), depth - 1) == expected
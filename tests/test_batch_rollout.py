@@ -0,0 +1,43 @@
+import random
+
+import numpy as np
+
+from dlgo.goboard import GameState, Move
+from dlgo.gotypes import Player, Point
+from dlgo.scoring import compute_game_result
+from mcts.batch_rollout import BatchRollout
+
+
+def test_settled_position_is_scored_like_the_game():
+    # both sides have only eyes left, so every game passes out at once
+    rows = [
+        '.xo.o',
+        'xxooo',
+        '.xo.o',
+        'xxooo',
+        '.xo.o',
+    ]
+    game = GameState.new_game(5)
+    for r, row in enumerate(rows, 1):
+        for c, stone in enumerate(row, 1):
+            if stone != '.':
+                game.board.place_stone(Player.black if stone == 'x' else Player.white, Point(r, c))
+    winner = compute_game_result(game).winner
+    assert winner == Player.white
+    assert BatchRollout(5, 5).simulate(game, 8) == [winner] * 8
+    assert BatchRollout(5, 5, margin=0).simulate(game, 8) == [winner] * 8
+
+
+def test_random_games_from_the_empty_board():
+    random.seed(0)
+    np.random.seed(0)
+    game = GameState.new_game(5).apply_move(Move.play(Point(3, 3)))
+    winners, played = BatchRollout(5, 5).simulate(game, 64, record_moves=True)
+    assert len(winners) == 64
+    assert set(winners) <= {Player.black, Player.white, None}
+    # each side wins some games from one stone in the centre
+    assert Player.black in winners and Player.white in winners
+    for points in played:
+        assert points[Player.white]
+        # only the first colour to play on a point is recorded
+        assert not points[Player.black] & points[Player.white]
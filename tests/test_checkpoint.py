@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+import mcts
+from dlgo.goboard import GameState
+from dlgo.gotypes import Player
+from mcts.checkpoint import load_tree, save_tree
+
+
+def assert_same_tree(node, loaded):
+    assert loaded.move == node.move
+    assert loaded.num_rollouts == node.num_rollouts
+    assert loaded.win_counts == node.win_counts
+    assert loaded.amaf_rollouts == node.amaf_rollouts
+    assert loaded.amaf_wins == node.amaf_wins
+    assert len(loaded.children) == len(node.children)
+    for child, loaded_child in zip(node.children, loaded.children):
+        assert_same_tree(child, loaded_child)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    random.seed(0)
+    agent = mcts.MCTSAgent(num_rounds=40, temperature=1.4, rave=True)
+    game = GameState.new_game(5)
+    agent.select_move(game)
+    path = str(tmp_path / 'tree.npy')
+    save_tree(agent.root, path)
+
+    loaded = load_tree(path, game)
+    assert_same_tree(agent.root, loaded)
+    # game states are replayed from the moves on first access
+    child = loaded.children[0]
+    expected = agent.root.children[0].game_state
+    assert child.game_state.board.zobrist_hash() == expected.board.zobrist_hash()
+    assert child.game_state.next_player == Player.white
+
+    with pytest.raises(ValueError):
+        load_tree(path, game.apply_move(child.move))
@@ -0,0 +1,63 @@
+import random
+
+import numpy as np
+import pytest
+
+from dlgo.agent.naive_fast import FastRandomBot
+from dlgo.dataprocessor.dataprocessor import DataProcessor, transformations
+from dlgo.encoders.base import get_encoder_by_name
+from dlgo.encoders.fourplane import FourplaneEncoder
+from dlgo.goboard import Board, GameState
+from dlgo.gotypes import Point
+
+
+def test_transform_planes_moves_points_like_transform_point():
+    planes = np.zeros((2, 5, 5))
+    planes[0, 0, 1] = 1
+    planes[1, 3, 4] = 1
+    for transformation in transformations:
+        moved = DataProcessor.transform_planes(planes, transformation)
+        for plane, (row, col) in zip(moved, [(1, 2), (4, 5)]):
+            point = DataProcessor.transform_point(Point(row, col), transformation, 5)
+            assert plane[point.row - 1, point.col - 1] == 1
+            assert plane.sum() == 1
+
+
+def test_encoding_a_transformed_board():
+    random.seed(0)
+    bot = FastRandomBot()
+    game = GameState.new_game(5)
+    for _ in range(10):
+        game = game.apply_move(bot.select_move(game))
+    # the transformed state has no history, so leave out the ko-aware
+    # legal move plane
+    encoder = FourplaneEncoder((5, 5), use_legal_moves=False)
+    encoded = encoder.encode(game)
+    for transformation in transformations:
+        board = Board(5, 5)
+        for point, string in game.board._grid.items():
+            if string is not None:
+                board.place_stone(string.color, DataProcessor.transform_point(point, transformation, 5))
+        transformed = GameState(board, game.next_player, None, None)
+        assert (encoder.encode(transformed) ==
+                DataProcessor.transform_planes(encoded, transformation)).all()
+
+
+def test_pack_and_unpack_features():
+    random.seed(1)
+    bot = FastRandomBot()
+    game = GameState.new_game(9)
+    states = []
+    for _ in range(30):
+        game = game.apply_move(bot.select_move(game))
+        states.append(game)
+    encoder = get_encoder_by_name('alphago', 9, dtype=np.uint8)
+    features = encoder.encode_batch(states)
+    packed = DataProcessor.pack_features(features)
+    assert packed.shape == (30, 6, 9, 9) and packed.dtype == np.uint8
+    unpacked = DataProcessor.unpack_features(packed, encoder.num_planes)
+    assert unpacked.dtype == np.float32
+    assert (unpacked == features).all()
+
+    with pytest.raises(ValueError):
+        DataProcessor.pack_features(features * 2)
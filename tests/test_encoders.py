@@ -0,0 +1,54 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from dlgo.agent.naive_fast import FastRandomBot
+from dlgo.dataprocessor.dataprocessor import DataProcessor
+from dlgo.encoders.base import get_encoder_by_name
+from dlgo.goboard import GameState
+from dlgo.gotypes import Player
+
+
+def test_oneplane_rejects_unsigned_dtypes():
+    with pytest.raises(ValueError):
+        get_encoder_by_name('oneplane', 5, dtype=np.uint8)
+    with pytest.raises(ValueError):
+        DataProcessor('oneplane', 'data', packed=True)
+    assert DataProcessor('fourplane', 'data', packed=True).encoder.dtype == np.uint8
+
+
+def history_reference(game_state, history):
+    player = game_state.next_player
+    planes = np.zeros((2 * history + 1, 5, 5))
+    state = game_state
+    for i in range(history):
+        if state is None:
+            break
+        stones = state.board.stone_array()
+        planes[2 * i] = stones == player.value
+        planes[2 * i + 1] = stones == player.other.value
+        state = state.previous_state
+    planes[-1] = player == Player.black
+    return planes
+
+
+def test_history_planes_follow_previous_states():
+    random.seed(0)
+    bot = FastRandomBot()
+    game = GameState.new_game(5)
+    states = [game]
+    for _ in range(40):
+        game = game.apply_move(bot.select_move(game))
+        states.append(game)
+    encoder = get_encoder_by_name('history', 5, history=4)
+    expected = np.stack([history_reference(state, 4) for state in states])
+    # in game order the ring buffer moves along, otherwise it is rebuilt
+    assert (encoder.encode_batch(states) == expected).all()
+    assert (encoder.encode_batch(states[::-1]) == expected[::-1]).all()
+
+    # one encoder shared between threads, as DataProcessor does
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(encoder.encode_batch, [states] * 8))
+    assert all((result == expected).all() for result in results)
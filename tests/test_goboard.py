@@ -0,0 +1,75 @@
+import pickle
+import random
+
+import numpy as np
+
+from dlgo.agent.naive_fast import FastRandomBot
+from dlgo.goboard import GameState, Move
+from dlgo.gotypes import Player, Point
+
+
+def test_detached_state_pickles_after_a_long_game():
+    random.seed(0)
+    bot = FastRandomBot()
+    game = GameState.new_game(19)
+    for _ in range(400):
+        move = bot.select_move(game)
+        game = game.apply_move(move if move.is_play else Move.pass_turn())
+    copy = pickle.loads(pickle.dumps(game.detached()))
+    assert (copy.legal_move_mask() == game.legal_move_mask()).all()
+    assert copy.previous_states == game.previous_states
+
+    passed = copy.apply_move(Move.pass_turn()).apply_move(Move.pass_turn())
+    assert passed.is_over()
+
+
+def test_incremental_counts_match_a_recount():
+    random.seed(2)
+    bot = FastRandomBot()
+    game = GameState.new_game(7)
+    captures = 0
+    for _ in range(150):
+        move = bot.select_move(game)
+        if not move.is_play:
+            break
+        before = sum(game.board.num_stones(player) for player in Player)
+        game = game.apply_move(move)
+        board = game.board
+        captures += sum(board.num_stones(player) for player in Player) < before + 1
+
+        strings = {id(string): string for string in board._grid.values() if string is not None}
+        for player in Player:
+            own = [string for string in strings.values() if string.color == player]
+            assert board.num_stones(player) == sum(len(string.stones) for string in own)
+            assert board.num_liberties(player) == sum(string.num_liberties for string in own)
+            assert board.num_atari(player) == sum(string.num_liberties == 1 for string in own)
+        territory = {Player.black: 0, Player.white: 0}
+        for point in board.neighbor_table:
+            if board.get(point) is not None:
+                continue
+            colors = set(board.get(neighbor) for neighbor in board.neighbor_table[point])
+            colors.discard(None)
+            if len(colors) == 1:
+                territory[colors.pop()] += 1
+        for player in Player:
+            assert board.num_territory(player) == territory[player]
+    assert captures > 0
+
+
+def test_legal_move_mask_matches_is_valid_move():
+    random.seed(3)
+    bot = FastRandomBot()
+    game = GameState.new_game(5)
+    for _ in range(120):
+        if game.is_over():
+            break
+        board = game.board
+        expected = np.zeros((5, 5), dtype=bool)
+        for point in board.neighbor_table:
+            # a fresh state has no mask yet, so is_valid_move checks the board
+            fresh = GameState(board, game.next_player, game.previous_state, game.last_move)
+            expected[point.row - 1, point.col - 1] = fresh.is_valid_move(Move.play(point))
+        assert (game.legal_move_mask() == expected).all()
+        assert sorted(move.point for move in game.legal_moves() if move.is_play) == \
+            sorted(Point(row + 1, col + 1) for row, col in zip(*np.nonzero(expected)))
+        game = game.apply_move(bot.select_move(game))
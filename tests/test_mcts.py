@@ -0,0 +1,16 @@
+import mcts
+from dlgo.goboard import GameState
+
+
+def test_ponder_cycle():
+    agent = mcts.MCTSAgent(num_rounds=5, temperature=1.4, ponder=True, ponder_limit=5)
+    game = GameState.new_game(5)
+    game = game.apply_move(agent.select_move(game))
+    # let the pondering thread run to its limit
+    agent.ponder_thread.join()
+    assert agent.ponder_rounds == 5
+
+    game = game.apply_move(game.legal_moves()[0])
+    assert agent.select_move(game) is not None
+    assert agent.last_report.ponder_rounds == 5
+    agent.stop_pondering()
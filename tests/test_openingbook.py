@@ -0,0 +1,36 @@
+from dlgo.dataprocessor.dataprocessor import DataProcessor, transformations
+from dlgo.goboard import Board, GameState, Move
+from dlgo.gosgf import Sgf_game
+from dlgo.gotypes import Player, Point
+from dlgo.openingbook.openingbook import OpeningBook, canonical_hash
+
+
+def transformed_board(stones, transformation, size=9):
+    board = Board(size, size)
+    for point, color in stones:
+        board.place_stone(color, DataProcessor.transform_point(point, transformation, size))
+    return board
+
+
+def test_canonical_hash_is_the_same_for_all_symmetries():
+    stones = [(Point(3, 3), Player.black), (Point(7, 5), Player.white), (Point(3, 4), Player.black)]
+    hashes = set(canonical_hash(transformed_board(stones, t))[0] for t in transformations)
+    assert len(hashes) == 1
+    # an asymmetric position is reached by one transformation only
+    assert len(canonical_hash(transformed_board(stones, 'identity'))[1]) == 1
+    # tengen looks the same in every orientation
+    assert len(canonical_hash(transformed_board([(Point(5, 5), Player.black)], 'identity'))[1]) == 8
+
+
+def test_book_answers_in_every_orientation():
+    book = OpeningBook(board_size=9)
+    book.add_game(Sgf_game.from_string('(;GM[1]SZ[9]RE[W+R];B[dc];W[gf])'))
+    book.finish()
+    # the SGF counts rows from the bottom
+    black_point, white_point = Point(7, 4), Point(4, 7)
+    for t in transformations:
+        game = GameState.new_game(9)
+        game = game.apply_move(Move.play(DataProcessor.transform_point(black_point, t, 9)))
+        [(move, count, win_rate)] = book.lookup(game)
+        assert move.point == DataProcessor.transform_point(white_point, t, 9)
+        assert (count, win_rate) == (1, 1.0)
@@ -0,0 +1,13 @@
+from dlgo.goboard import GameState
+from mcts.pattern_rollout import BLACK, PatternRollout
+
+
+def test_select_stops_when_only_rounding_is_left():
+    rollout = PatternRollout()
+    rollout._setup(GameState.new_game(5))
+    tree = rollout.trees[BLACK]
+    for i in range(tree.size):
+        tree.set(i, 0.0)
+    # drift that leaves the total above zero with every weight at 0
+    tree.total = 1e-6
+    assert rollout._select(BLACK, -1, -1) == -1
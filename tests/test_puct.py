@@ -0,0 +1,15 @@
+from dlgo.goboard import GameState, Move
+from mcts.puct import PUCTNode, UniformEvaluator
+
+
+def test_pass_is_always_a_candidate():
+    game = GameState.new_game(5)
+    [(priors, value)] = UniformEvaluator().evaluate([game])
+    node = PUCTNode(game)
+    node.expand(priors)
+    assert abs(node.priors[Move.pass_turn()] - 1.0 / 25) < 1e-12
+    assert len(node.priors) == 26
+
+    node = PUCTNode(game)
+    node.expand(priors, pass_prior=0.001)
+    assert node.priors[Move.pass_turn()] == 0.001
@@ -0,0 +1,16 @@
+from dlgo.goboard import GameState
+from dlgo.minimax.minimax import GameResult
+from dlgo.minimax.solver import ProofNumberSolver
+
+
+def test_empty_3x3_is_a_black_win(tmp_path):
+    path = str(tmp_path / 'cache.npz')
+    solver = ProofNumberSolver(cache_path=path)
+    game = GameState.new_game(3)
+    assert solver.solve(game) == GameResult.win
+    solver.save()
+
+    # the saved cache answers without searching
+    reloaded = ProofNumberSolver(cache_path=path, max_nodes=1)
+    assert reloaded.solve(game) == GameResult.win
+    assert ProofNumberSolver(max_nodes=1).solve(game) is None
@@ -0,0 +1,51 @@
+from dlgo.goboard import Board
+from dlgo.gotypes import Player, Point
+from dlgo.tactics import TacticalReader
+
+
+def board_from_rows(rows):
+    board = Board(len(rows), len(rows[0]))
+    for r, row in enumerate(rows, 1):
+        for c, stone in enumerate(row, 1):
+            if stone != '.':
+                board.place_stone(Player.black if stone == 'x' else Player.white, Point(r, c))
+    return board
+
+
+def test_ladder():
+    board = board_from_rows([
+        '.........',
+        '.........',
+        '.........',
+        '.....x...',
+        '...xo....',
+        '....x....',
+        '.........',
+        '.........',
+        '.........',
+    ])
+    reader = TacticalReader()
+    assert reader.can_capture(board, Point(5, 5)) is True
+    assert sorted(reader.ladder_captures(board, Point(5, 5))) == [Point(4, 5), Point(5, 6)]
+
+    board.place_stone(Player.white, Point(6, 4))
+    assert reader.can_capture(board, Point(5, 5)) is False
+
+
+def test_crawl_along_the_edge_is_read_out():
+    # recaptures along the way would go round in circles without the
+    # simple ko rule and run out of nodes
+    board = board_from_rows([
+        '....xo...',
+        '.........',
+        '.x.......',
+        '.......o.',
+        '.........',
+        '....o....',
+        '.........',
+        '......x..',
+        '..x......',
+    ])
+    reader = TacticalReader()
+    assert reader.can_capture(board, Point(1, 6)) is True
+    assert reader.nodes < reader.max_nodes
@@ -0,0 +1,44 @@
+import math
+
+import pytest
+
+from dlgo.tournament.tournament import SPRT, bayes_elo, elo_from_score, elo_interval
+
+
+def test_elo_from_score():
+    assert elo_from_score(0.5) == pytest.approx(0.0)
+    # a 3:1 score is 400 * log10(3) Elo
+    assert elo_from_score(0.75) == pytest.approx(400 * math.log10(3))
+    assert elo_from_score(0.25) == pytest.approx(-400 * math.log10(3))
+
+
+def test_elo_interval():
+    elo, low, high = elo_interval(50, 50)
+    assert elo == pytest.approx(0.0)
+    assert low == pytest.approx(-high)
+    assert 60 < high < 75
+    # a clean sweep still gets a finite lower bound
+    elo, low, high = elo_interval(10, 0)
+    assert 0 < low < elo and high == math.inf
+
+
+def test_bayes_elo():
+    # with prior 2 the 3:1 match counts as 4:2, and two players are
+    # 400 * log10(4 / 2) apart, centred on 0
+    ratings = bayes_elo({('a', 'b'): 3, ('b', 'a'): 1})
+    assert ratings['a'] == pytest.approx(200 * math.log10(2))
+    assert ratings['b'] == pytest.approx(-200 * math.log10(2))
+
+    ratings = bayes_elo({('a', 'b'): 6, ('b', 'a'): 4, ('b', 'c'): 6, ('c', 'b'): 4})
+    assert ratings['a'] > ratings['b'] > ratings['c']
+    assert ratings['b'] == pytest.approx(0.0, abs=1e-6)
+    assert sum(ratings.values()) == pytest.approx(0.0, abs=1e-6)
+
+
+def test_sprt():
+    sprt = SPRT(elo0=0, elo1=50, alpha=0.05, beta=0.05)
+    assert sprt.upper == pytest.approx(math.log(0.95 / 0.05))
+    assert sprt.lower == pytest.approx(-sprt.upper)
+    assert sprt.status(10, 10) is None
+    assert sprt.status(30, 5) == 'H1'
+    assert sprt.status(0, 20) == 'H0'